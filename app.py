@@ -1,8 +1,14 @@
 import os
 import io
+import re
 import csv
+import hmac
 import json
+import orjson
 import smtplib
+import sqlite3
+import threading
+import time
 import cloudinary
 import cloudinary.uploader
 import anthropic
@@ -10,12 +16,22 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from email.mime.text import MIMEText
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from functools import wraps
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_from_directory, Response
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, g, send_from_directory, Response, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, case, delete, event, exists, extract, func, insert, or_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload, load_only, object_session, selectinload
+from twilio.base.exceptions import TwilioRestException
 from twilio.rest import Client
 from twilio.twiml.messaging_response import MessagingResponse
+from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 import secrets
 
@@ -23,8 +39,36 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///sms_platform.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    # Reuse the most recently returned connection so the pool keeps a small warm set. The connections that sit
+    # idle at the bottom of the stack are the ones a managed Postgres drops, so check each one on checkout and
+    # recycle them before a typical 5-minute idle timeout. Sized for the gunicorn threads plus the background
+    # pool and scheduler
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 10, 'pool_use_lifo': True, 'pool_pre_ping': True, 'pool_recycle': 280
+    }
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 
+# jsonify/request.json go through orjson. Keys stay sorted like Flask's default; datetimes come out as
+# ISO 8601 and Decimals (Postgres numeric results) as numbers
+def orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def orjson_dumps(obj):
+    """Encode obj to JSON bytes with the app-wide orjson options"""
+    return orjson.dumps(obj, default=orjson_default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson_dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app.json = OrjsonProvider(app)
+
 # Cloudinary config (for persistent file storage)
 cloudinary.config(
     cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
@@ -57,6 +101,18 @@ APP_BASE_URL = os.environ.get('APP_BASE_URL', 'http://localhost:5000')
 
 db = SQLAlchemy(app)
 
+# Local SQLite: WAL lets the inbox keep reading while a broadcast or webhook is writing
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+# Background worker pool for work that shouldn't block a request (notifications, AI drafts)
+background_executor = ThreadPoolExecutor(max_workers=4)
+
 # Association table for partner products
 partner_products = db.Table('partner_products',
     db.Column('partner_id', db.Integer, db.ForeignKey('partner.id'), primary_key=True),
@@ -107,6 +163,15 @@ class User(db.Model):
     def is_admin(self):
         return self.role == 'admin'
 
+# Shared by the Partner properties and the partner list, which serializes plain rows with the same columns
+def partner_full_name(p):
+    if p.last_name:
+        return f"{p.first_name} {p.last_name}"
+    return p.first_name
+
+def partner_is_new(p):
+    return p.last_contacted is None
+
 class Partner(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
@@ -115,8 +180,8 @@ class Partner(db.Model):
     last_name = db.Column(db.String(50))
     company = db.Column(db.String(100))
     phone = db.Column(db.String(20), nullable=False)
-    region_id = db.Column(db.Integer, db.ForeignKey('region.id'))
-    tsd_id = db.Column(db.Integer, db.ForeignKey('tsd.id'))
+    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), index=True)
+    tsd_id = db.Column(db.Integer, db.ForeignKey('tsd.id'), index=True)
     notes = db.Column(db.Text)
     opted_out = db.Column(db.Boolean, default=False)
     pinned = db.Column(db.Boolean, default=False)
@@ -131,17 +196,21 @@ class Partner(db.Model):
     messages = db.relationship('Message', backref='partner', lazy=True)
     
     # Unique phone per tenant (not globally)
-    __table_args__ = (db.UniqueConstraint('tenant_id', 'phone', name='unique_phone_per_tenant'),)
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'phone', name='unique_phone_per_tenant'),
+        db.Index('ix_partner_company', 'company'),
+        db.Index('ix_partner_last_contacted', 'last_contacted'),
+        # Incoming webhooks only know the sender's number, so the (tenant_id, phone) constraint can't serve them
+        db.Index('ix_partner_phone', 'phone'),
+    )
     
     @property
     def full_name(self):
-        if self.last_name:
-            return f"{self.first_name} {self.last_name}"
-        return self.first_name
+        return partner_full_name(self)
     
     @property
     def is_new(self):
-        return self.last_contacted is None
+        return partner_is_new(self)
 
 class Tag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -185,6 +254,27 @@ class Message(db.Model):
     ai_draft = db.Column(db.Text)  # AI-generated draft reply
     ai_draft_status = db.Column(db.String(20))  # 'pending', 'approved', 'edited', 'rejected'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Thread lookups: partner_id = ? ORDER BY created_at, plus a partial index for replies-only lookups.
+    # Dashboard stats range-scan created_at by direction and count unread replies; delivery receipts look up by SID.
+    __table_args__ = (
+        db.Index('ix_message_partner_created', 'partner_id', 'created_at'),
+        db.Index('ix_message_partner_inbound_created', 'partner_id', 'created_at',
+                 postgresql_where=db.text("direction = 'inbound'"), sqlite_where=db.text("direction = 'inbound'")),
+        db.Index('ix_message_created_direction', 'created_at', 'direction'),
+        db.Index('ix_message_unread', 'partner_id',
+                 postgresql_where=db.text("direction = 'inbound' AND status = 'received'"),
+                 sqlite_where=db.text("direction = 'inbound' AND status = 'received'")),
+        db.Index('ix_message_twilio_sid', 'twilio_sid',
+                 postgresql_where=db.text('twilio_sid IS NOT NULL'), sqlite_where=db.text('twilio_sid IS NOT NULL')),
+    )
+
+# Per-partner message counts for completed days, rolled up hourly so dashboard stats don't rescan old messages
+class MessageDailyStat(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    partner_id = db.Column(db.Integer, db.ForeignKey('partner.id'), primary_key=True)
+    inbound = db.Column(db.Integer, nullable=False, default=0)
+    outbound = db.Column(db.Integer, nullable=False, default=0)
 
 class MessageTemplate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -198,12 +288,32 @@ class ScheduledMessage(db.Model):
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # Who scheduled it
     message_template = db.Column(db.Text, nullable=False)
-    partner_ids = db.Column(db.Text, nullable=False)
+    partner_ids = db.Column(db.JSON, nullable=False)  # List of partner ids
     media_url = db.Column(db.String(500))
     media_type = db.Column(db.String(50))
     scheduled_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # The scheduler only ever looks for pending rows that are due
+    __table_args__ = (
+        db.Index('ix_scheduled_message_pending_time', 'scheduled_time',
+                 postgresql_where=db.text("status = 'pending'"), sqlite_where=db.text("status = 'pending'")),
+    )
+
+class BroadcastJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # Who sent it
+    message_template = db.Column(db.Text, nullable=False)
+    partner_ids = db.Column(db.JSON, nullable=False)  # List of partner ids
+    media_url = db.Column(db.String(500))
+    media_type = db.Column(db.String(50))
+    status = db.Column(db.String(20), default='pending')  # 'pending', 'sending', 'done', 'failed'
+    processed = db.Column(db.Integer, default=0)  # Recipients handled so far
+    results = db.Column(db.JSON)  # [{'partner': name, 'result': send_sms result}] once finished
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
 
 class AIKnowledge(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -213,6 +323,13 @@ class AIKnowledge(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Knowledge is listed by (category, title) and looked up by both (e.g. the writing style entry);
+    # onboarding counts and the calendar link entry go through tenant_id
+    __table_args__ = (
+        db.Index('ix_ai_knowledge_category_title', 'category', 'title'),
+        db.Index('ix_ai_knowledge_tenant_category', 'tenant_id', 'category'),
+    )
 
 class AISettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -222,13 +339,35 @@ class AISettings(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     __table_args__ = (db.UniqueConstraint('tenant_id', 'setting_key', name='unique_setting_per_tenant'),)
 
+# Eager-load everything the partner serializers touch (avoids a lazy SELECT per row)
+PARTNER_LOAD_OPTIONS = (
+    joinedload(Partner.region),
+    joinedload(Partner.tsd),
+    selectinload(Partner.products),
+    selectinload(Partner.tags),
+)
+
 # Helper functions
 def get_current_user():
-    """Get current logged-in user"""
+    """Get current logged-in user (loaded once per request, together with its tenant)"""
     user_id = session.get('user_id')
-    if user_id:
-        return User.query.get(user_id)
-    return None
+    if not user_id:
+        return None
+    if g.get('current_user_id') != user_id:
+        g.current_user = User.query.options(joinedload(User.tenant)).filter_by(id=user_id).first()
+        g.current_user_id = user_id
+    return g.current_user
+
+# Passwords are stored as werkzeug hashes. Accounts created before hashing still hold the plain password;
+# they keep working and are upgraded to a hash on their next successful check (the caller commits).
+def check_user_password(user, password):
+    stored = user.password_hash or ''
+    if stored.startswith(('scrypt:', 'pbkdf2:')):
+        return check_password_hash(stored, password)
+    if hmac.compare_digest(stored.encode(), password.encode()):
+        user.password_hash = generate_password_hash(password)
+        return True
+    return False
 
 def get_current_tenant():
     """Get current user's tenant"""
@@ -264,54 +403,108 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Twilio client
+# Twilio client (one per process so its HTTP session keeps connections to Twilio alive)
+twilio_client = None
+
 def get_twilio_client():
-    if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
-        return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-    return None
+    global twilio_client
+    if twilio_client is None and TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
+        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return twilio_client
+
+# Phone numbers are stored in E.164 (+15551234567); bare 10-digit numbers are assumed to be US
+PHONE_NON_DIGITS_RE = re.compile(r'\D+')
+
+def normalize_phone(raw):
+    raw = (raw or '').strip()
+    digits = PHONE_NON_DIGITS_RE.sub('', raw)
+    if raw.startswith('+') and 8 <= len(digits) <= 15:
+        return '+' + digits
+    if len(digits) == 10:
+        return '+1' + digits
+    if len(digits) == 11 and digits[0] == '1':
+        return '+' + digits
+    raise ValueError(f'Invalid phone number: {raw}')
+
+def phone_exists(tenant_id, phone):
+    return db.session.query(exists().where(Partner.tenant_id == tenant_id, Partner.phone == phone)).scalar()
 
 # Personalize message
+TEMPLATE_TOKEN_RE = re.compile(r'\{\{(first_name|last_name|name|company|region|tsd)\}\}')
+
 def personalize_message(template, partner):
-    message = template.replace('{{first_name}}', partner.first_name or '')
-    message = message.replace('{{last_name}}', partner.last_name or '')
-    message = message.replace('{{name}}', partner.full_name or '')
-    message = message.replace('{{company}}', partner.company or '')
-    if partner.region:
-        message = message.replace('{{region}}', partner.region.name)
-    else:
-        message = message.replace('{{region}}', '')
-    if partner.tsd:
-        message = message.replace('{{tsd}}', partner.tsd.name)
-    else:
-        message = message.replace('{{tsd}}', '')
-    return message
+    if '{{' not in template:
+        return template
+    values = {
+        'first_name': partner.first_name or '',
+        'last_name': partner.last_name or '',
+        'name': partner.full_name or '',
+        'company': partner.company or '',
+        'region': partner.region.name if partner.region else '',
+        'tsd': partner.tsd.name if partner.tsd else '',
+    }
+    return TEMPLATE_TOKEN_RE.sub(lambda m: values[m.group(1)], template)
+
+# Twilio API requests are spaced to at most this many per second across all sending threads,
+# so a large broadcast is paced instead of running into 429s
+SMS_SEND_RATE = 10
+sms_rate_lock = threading.Lock()
+sms_next_send_at = 0.0
+
+def wait_for_sms_slot():
+    """Block until this thread may make the next Twilio request"""
+    global sms_next_send_at
+    with sms_rate_lock:
+        now = time.monotonic()
+        send_at = max(now, sms_next_send_at)
+        sms_next_send_at = send_at + 1 / SMS_SEND_RATE
+    if send_at > now:
+        time.sleep(send_at - now)
+
+# Twilio responses that mean the message was not accepted and can safely be retried (other 5xx may
+# have been sent anyway, so retrying those risks a duplicate text)
+SMS_RETRY_STATUSES = frozenset({429, 503})
+SMS_MAX_ATTEMPTS = 3
 
 # Send SMS/MMS
+def deliver_sms(client, to_phone, body, media_url=None):
+    """Hand one message to Twilio (no database access, so it's safe to call from worker threads)"""
+    params = {
+        'body': body,
+        'from_': TWILIO_PHONE_NUMBER,
+        'to': to_phone
+    }
+    
+    if media_url:
+        params['media_url'] = [media_url]
+    
+    for attempt in range(SMS_MAX_ATTEMPTS):
+        wait_for_sms_slot()
+        try:
+            return client.messages.create(**params)
+        except TwilioRestException as e:
+            if e.status not in SMS_RETRY_STATUSES or attempt == SMS_MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(2 ** attempt)  # 1s, then 2s
+
 def send_sms(to_phone, body, partner_id=None, media_url=None, media_type=None):
     client = get_twilio_client()
     if not client:
         return {'success': False, 'error': 'Twilio not configured'}
     
-    # Check opt-out
-    if partner_id:
-        partner = Partner.query.get(partner_id)
-        if partner and partner.opted_out:
-            return {'success': False, 'error': 'Partner has opted out'}
+    # Check opt-out (session.get uses the identity map, so callers that already loaded the partner skip the SELECT)
+    partner = db.session.get(Partner, partner_id) if partner_id else None
+    if partner and partner.opted_out:
+        return {'success': False, 'error': 'Partner has opted out'}
     
     try:
-        params = {
-            'body': body,
-            'from_': TWILIO_PHONE_NUMBER,
-            'to': to_phone
-        }
-        
-        if media_url:
-            params['media_url'] = [media_url]
-        
-        message = client.messages.create(**params)
+        message = deliver_sms(client, to_phone, body, media_url)
         
         # Log message and update last_contacted
         if partner_id:
+            if partner:
+                partner.last_contacted = datetime.utcnow()
+            
             msg = Message(
                 partner_id=partner_id,
                 direction='outbound',
@@ -322,17 +515,82 @@ def send_sms(to_phone, body, partner_id=None, media_url=None, media_type=None):
                 twilio_sid=message.sid
             )
             db.session.add(msg)
-            
-            partner = Partner.query.get(partner_id)
-            if partner:
-                partner.last_contacted = datetime.utcnow()
-            
             db.session.commit()
         
         return {'success': True, 'sid': message.sid, 'status': message.status}
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
+# Twilio calls are network-bound, so bulk sends overlap them across a small thread pool
+SMS_SEND_CONCURRENCY = 16
+
+def send_sms_batch(sends, media_url=None, media_type=None):
+    """Send [(partner_id, phone, body)] concurrently, then log the sent messages in one commit.
+    Callers filter out opted-out partners. Returns send_sms-style results in the same order, even if
+    logging fails: the messages already went out, so callers must not treat them as unsent."""
+    client = get_twilio_client()
+    if not client:
+        return [{'success': False, 'error': 'Twilio not configured'} for _ in sends]
+    
+    def deliver(send):
+        partner_id, phone, body = send
+        try:
+            message = deliver_sms(client, phone, body, media_url)
+            return {'success': True, 'sid': message.sid, 'status': message.status}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    with ThreadPoolExecutor(max_workers=SMS_SEND_CONCURRENCY) as executor:
+        results = list(executor.map(deliver, sends))
+    
+    sent = [(send, result) for send, result in zip(sends, results) if result['success']]
+    try:
+        if sent:
+            # One executemany INSERT; nothing here needs the Message objects back
+            db.session.execute(insert(Message), [{
+                'partner_id': partner_id,
+                'direction': 'outbound',
+                'body': body,
+                'media_url': media_url,
+                'media_type': media_type,
+                'status': result['status'],
+                'twilio_sid': result['sid']
+            } for (partner_id, _, body), result in sent])
+            db.session.execute(
+                update(Partner).where(Partner.id.in_([partner_id for (partner_id, _, _), _ in sent]))
+                .values(last_contacted=datetime.utcnow()).execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Failed to log sent messages {[result['sid'] for _, result in sent]}: {e}")
+    return results
+
+# SMTP connection reused across notifications (TLS + login once, not per email)
+smtp_connection = None
+smtp_lock = threading.Lock()
+
+def get_smtp_connection():
+    """Return a logged-in SMTP connection, reconnecting if the server dropped it"""
+    global smtp_connection
+    if smtp_connection is not None:
+        try:
+            if smtp_connection.noop()[0] == 250:
+                return smtp_connection
+        except (smtplib.SMTPException, OSError):
+            pass
+        try:
+            smtp_connection.close()
+        except Exception:
+            pass
+        smtp_connection = None
+    
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+    server.starttls()
+    server.login(SMTP_USER, SMTP_PASSWORD)
+    smtp_connection = server
+    return server
+
 # Send notification
 def send_notification(partner_name, message_body):
     if NOTIFICATION_EMAIL and SMTP_USER and SMTP_PASSWORD:
@@ -342,10 +600,8 @@ def send_notification(partner_name, message_body):
             msg['From'] = SMTP_USER
             msg['To'] = NOTIFICATION_EMAIL
             
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SMTP_USER, SMTP_PASSWORD)
-                server.send_message(msg)
+            with smtp_lock:
+                get_smtp_connection().send_message(msg)
         except Exception as e:
             print(f"Email notification failed: {e}")
     
@@ -371,7 +627,7 @@ def login():
         # Look up user in database
         user = User.query.filter_by(username=username, is_active=True).first()
         
-        if user and user.password_hash == password:  # Simple password check (consider hashing later)
+        if user and check_user_password(user, password):
             session['user_id'] = user.id
             session['tenant_id'] = user.tenant_id
             user.last_login = datetime.utcnow()
@@ -384,7 +640,7 @@ def login():
             return redirect(url_for('index'))
         
         # Fallback: check env vars for initial admin setup
-        if username == APP_USERNAME and password == APP_PASSWORD:
+        if username == APP_USERNAME and hmac.compare_digest(password.encode(), APP_PASSWORD.encode()):
             # Create default tenant and admin if not exists
             tenant = Tenant.query.first()
             if not tenant:
@@ -397,7 +653,7 @@ def login():
                 user = User(
                     tenant_id=tenant.id,
                     username=APP_USERNAME,
-                    password_hash=APP_PASSWORD,
+                    password_hash=generate_password_hash(APP_PASSWORD),
                     role='admin',
                     first_name='Admin'
                 )
@@ -477,13 +733,13 @@ def api_partners():
         data = request.json
         
         # Validate phone
-        phone = data.get('phone', '').strip()
-        if not phone.startswith('+'):
-            phone = '+1' + phone.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')
+        try:
+            phone = normalize_phone(data.get('phone'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Check duplicate within tenant
-        existing = Partner.query.filter_by(tenant_id=tenant.id, phone=phone).first()
-        if existing:
+        if phone_exists(tenant.id, phone):
             return jsonify({'error': 'Phone number already exists'}), 400
         
         partner = Partner(
@@ -554,34 +810,71 @@ def api_partners():
     if request.args.get('new_only') == 'true':
         query = query.filter(Partner.last_contacted.is_(None))
     
-    partners = query.order_by(Partner.company).all()
-    
-    return jsonify([{
+    # Plain rows rather than Partner objects: the list can be long and nothing here is modified.
+    # Region/TSD names come from the same query; products and tags take one query each.
+    partners = query.outerjoin(Region, Partner.region).outerjoin(TSD, Partner.tsd).with_entities(
+        Partner.id, Partner.first_name, Partner.last_name, Partner.company, Partner.phone,
+        Partner.region_id, Region.name.label('region'), Partner.tsd_id, TSD.name.label('tsd'),
+        Partner.notes, Partner.opted_out, Partner.last_contacted, Partner.created_at
+    ).order_by(Partner.company)
+    partner_ids = query.with_entities(Partner.id).scalar_subquery()
+    
+    product_rows = db.session.query(partner_products.c.partner_id, Product.id, Product.name).join(
+        Product, Product.id == partner_products.c.product_id
+    ).filter(partner_products.c.partner_id.in_(partner_ids)).order_by(partner_products.c.partner_id)
+    products_by_partner = {pid: [{'id': r.id, 'name': r.name} for r in rows]
+                           for pid, rows in groupby(product_rows, key=lambda r: r.partner_id)}
+    
+    tag_rows = db.session.query(partner_tags.c.partner_id, Tag.id, Tag.name, Tag.color).join(
+        Tag, Tag.id == partner_tags.c.tag_id
+    ).filter(partner_tags.c.partner_id.in_(partner_ids)).order_by(partner_tags.c.partner_id)
+    tags_by_partner = {pid: [{'id': r.id, 'name': r.name, 'color': r.color} for r in rows]
+                       for pid, rows in groupby(tag_rows, key=lambda r: r.partner_id)}
+    
+    return orjson_stream_response({
         'id': p.id,
         'first_name': p.first_name,
         'last_name': p.last_name,
-        'full_name': p.full_name,
+        'full_name': partner_full_name(p),
         'company': p.company,
         'phone': p.phone,
         'region_id': p.region_id,
-        'region': p.region.name if p.region else None,
+        'region': p.region,
         'tsd_id': p.tsd_id,
-        'tsd': p.tsd.name if p.tsd else None,
-        'products': [{'id': prod.id, 'name': prod.name} for prod in p.products],
-        'tags': [{'id': tag.id, 'name': tag.name, 'color': tag.color} for tag in p.tags],
+        'tsd': p.tsd,
+        'products': products_by_partner.get(p.id, []),
+        'tags': tags_by_partner.get(p.id, []),
         'notes': p.notes,
         'opted_out': p.opted_out,
-        'is_new': p.is_new,
+        'is_new': partner_is_new(p),
         'last_contacted': p.last_contacted.isoformat() if p.last_contacted else None,
         'created_at': p.created_at.isoformat()
-    } for p in partners])
+    } for p in partners.yield_per(200))
 
 @app.route('/api/partners/<int:id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
 def api_partner(id):
     user = get_current_user()
     tenant = get_current_tenant()
-    partner = Partner.query.get_or_404(id)
+    
+    if request.method == 'DELETE':
+        # Only the ownership columns are needed to authorize a delete
+        owner = Partner.query.with_entities(Partner.tenant_id, Partner.user_id).filter_by(id=id).first_or_404()
+        if owner.tenant_id != tenant.id:
+            return jsonify({'error': 'Not found'}), 404
+        if not user.is_admin and owner.user_id != user.id:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        # Delete associated rows first, then the partner, without loading any of them
+        db.session.execute(delete(partner_products).where(partner_products.c.partner_id == id))
+        db.session.execute(delete(partner_tags).where(partner_tags.c.partner_id == id))
+        db.session.execute(delete(Message).where(Message.partner_id == id))
+        db.session.execute(delete(MessageDailyStat).where(MessageDailyStat.partner_id == id))
+        db.session.execute(delete(Partner).where(Partner.id == id))
+        db.session.commit()
+        return jsonify({'success': True})
+    
+    partner = Partner.query.options(*PARTNER_LOAD_OPTIONS).get_or_404(id)
     
     # Check ownership (admins can access all in tenant)
     if partner.tenant_id != tenant.id:
@@ -589,19 +882,16 @@ def api_partner(id):
     if not user.is_admin and partner.user_id != user.id:
         return jsonify({'error': 'Access denied'}), 403
     
-    if request.method == 'DELETE':
-        # Delete associated messages first
-        Message.query.filter_by(partner_id=id).delete()
-        db.session.delete(partner)
-        db.session.commit()
-        return jsonify({'success': True})
-    
     if request.method == 'PUT':
         data = request.json
         partner.first_name = data.get('first_name', partner.first_name)
         partner.last_name = data.get('last_name', partner.last_name)
         partner.company = data.get('company', partner.company)
-        partner.phone = data.get('phone', partner.phone)
+        if data.get('phone'):
+            try:
+                partner.phone = normalize_phone(data['phone'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         partner.region_id = data.get('region_id') or None
         partner.tsd_id = data.get('tsd_id') or None
         partner.notes = data.get('notes', partner.notes)
@@ -637,7 +927,7 @@ def api_partner(id):
         'notes': partner.notes,
         'opted_out': partner.opted_out,
         'is_new': partner.is_new,
-        'last_contacted': partner.last_contacted.isoformat() if partner.last_contacted else None
+        'last_contacted': partner.last_contacted
     })
 
 # API: Import CSV
@@ -656,32 +946,47 @@ def api_import_partners():
     
     try:
         content = file.read().decode('utf-8')
-        reader = csv.DictReader(io.StringIO(content))
+        reader = csv.reader(io.StringIO(content))
+        
+        # Resolve column positions once from the header (flexible column names)
+        header = [h.strip().lower().replace(' ', '_') for h in next(reader, [])]
+        aliases = {'firstname': 'first_name', 'lastname': 'last_name'}
+        columns = {}
+        for index, name in enumerate(header):
+            columns.setdefault(aliases.get(name, name), index)
+        
+        def field(row, name):
+            index = columns.get(name)
+            return row[index].strip() if index is not None and index < len(row) else ''
         
         imported = 0
         skipped = 0
         errors = []
         
+        # Load the tenant's phones once instead of checking each row against the DB
+        existing_phones = {phone for (phone,) in db.session.query(Partner.phone).filter_by(tenant_id=tenant.id)}
+        
         for row in reader:
+            if not row:
+                continue
             try:
                 # Get phone and clean it
-                phone = row.get('phone', row.get('Phone', '')).strip()
+                phone = field(row, 'phone')
                 if not phone:
                     skipped += 1
                     continue
                 
-                if not phone.startswith('+'):
-                    phone = '+1' + phone.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')
+                phone = normalize_phone(phone)
                 
-                # Check if exists in tenant
-                if Partner.query.filter_by(tenant_id=tenant.id, phone=phone).first():
+                # Check if exists in tenant (or earlier in this file)
+                if phone in existing_phones:
                     skipped += 1
                     continue
                 
-                # Get other fields (flexible column names)
-                first_name = row.get('first_name', row.get('First Name', row.get('FirstName', ''))).strip()
-                last_name = row.get('last_name', row.get('Last Name', row.get('LastName', ''))).strip()
-                company = row.get('company', row.get('Company', '')).strip()
+                # Get other fields
+                first_name = field(row, 'first_name')
+                last_name = field(row, 'last_name')
+                company = field(row, 'company')
                 
                 if not first_name:
                     skipped += 1
@@ -696,6 +1001,7 @@ def api_import_partners():
                     phone=phone
                 )
                 db.session.add(partner)
+                existing_phones.add(phone)
                 imported += 1
                 
             except Exception as e:
@@ -720,34 +1026,110 @@ def api_export_partners():
     
     # Users export only their own, admins can export all
     if user.is_admin:
-        partners = Partner.query.filter_by(tenant_id=user.tenant_id).order_by(Partner.company).all()
+        query = Partner.query.filter_by(tenant_id=user.tenant_id)
     else:
-        partners = Partner.query.filter_by(user_id=user.id).order_by(Partner.company).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['first_name', 'last_name', 'company', 'phone', 'region', 'tsd', 'products', 'notes', 'last_contacted'])
-    
-    for p in partners:
-        writer.writerow([
-            p.first_name,
-            p.last_name or '',
-            p.company or '',
-            p.phone,
-            p.region.name if p.region else '',
-            p.tsd.name if p.tsd else '',
-            ', '.join([prod.name for prod in p.products]),
-            p.notes or '',
-            p.last_contacted.isoformat() if p.last_contacted else ''
-        ])
-    
-    output.seek(0)
+        query = Partner.query.filter_by(user_id=user.id)
+    query = query.options(
+        joinedload(Partner.region), joinedload(Partner.tsd), selectinload(Partner.products)
+    ).order_by(Partner.company)
+    
+    def generate():
+        # Write each row into a small reusable buffer and stream it out
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['first_name', 'last_name', 'company', 'phone', 'region', 'tsd', 'products', 'notes', 'last_contacted'])
+        
+        for p in query.yield_per(500):
+            writer.writerow([
+                p.first_name,
+                p.last_name or '',
+                p.company or '',
+                p.phone,
+                p.region.name if p.region else '',
+                p.tsd.name if p.tsd else '',
+                ', '.join([prod.name for prod in p.products]),
+                p.notes or '',
+                p.last_contacted.isoformat() if p.last_contacted else ''
+            ])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        
+        yield output.getvalue()
+    
     return Response(
-        output.getvalue(),
+        stream_with_context(generate()),
         mimetype='text/csv',
         headers={'Content-Disposition': 'attachment; filename=partners.csv'}
     )
 
+# Cache invalidation from mapper events waits until the session commits: the events fire at flush, before
+# other threads can see the change, and a flush that is rolled back shouldn't evict anything
+def clear_after_commit(target, clear, *args):
+    object_session(target).info.setdefault('clear_after_commit', []).append((clear, args))
+
+@event.listens_for(Session, 'after_commit')
+def run_clears_after_commit(session):
+    for clear, args in session.info.pop('clear_after_commit', []):
+        clear(*args)
+
+@event.listens_for(Session, 'after_rollback')
+def drop_clears_after_rollback(session):
+    session.info.pop('clear_after_commit', None)
+
+# Lookup lists (regions, TSDs, products, tags) are read on every page load but rarely change,
+# so the serialized rows are cached per tenant and dropped once a write to them commits. The version
+# stops a read that started before that commit from putting the old rows back.
+lookup_cache = {}
+lookup_cache_version = 0
+
+def invalidate_lookup_cache(key):
+    global lookup_cache_version
+    lookup_cache_version += 1
+    lookup_cache.pop(key, None)
+
+@event.listens_for(Region, 'after_insert')
+@event.listens_for(Region, 'after_update')
+@event.listens_for(Region, 'after_delete')
+@event.listens_for(TSD, 'after_insert')
+@event.listens_for(TSD, 'after_update')
+@event.listens_for(TSD, 'after_delete')
+@event.listens_for(Product, 'after_insert')
+@event.listens_for(Product, 'after_update')
+@event.listens_for(Product, 'after_delete')
+@event.listens_for(Tag, 'after_insert')
+@event.listens_for(Tag, 'after_update')
+@event.listens_for(Tag, 'after_delete')
+def clear_lookup_cache(mapper, connection, target):
+    clear_after_commit(target, invalidate_lookup_cache, (mapper.class_.__name__, target.tenant_id))
+
+def get_lookup_list(model, tenant_id, serialize):
+    key = (model.__name__, tenant_id)
+    cached = lookup_cache.get(key)
+    if cached is None:
+        version = lookup_cache_version
+        rows = model.query.filter_by(tenant_id=tenant_id).order_by(model.name).all()
+        cached = [serialize(r) for r in rows]
+        if version == lookup_cache_version:
+            lookup_cache[key] = cached
+    return cached
+
+def orjson_stream_response(items):
+    """JSON array streamed one item at a time, so a long list is never held in memory as a whole"""
+    def generate():
+        yield b'['
+        for i, item in enumerate(items):
+            yield (b',' if i else b'') + orjson_dumps(item)
+        yield b']'
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def lookup_response(payload):
+    """JSON response with an ETag so unchanged lists come back as 304 Not Modified"""
+    resp = jsonify(payload)
+    resp.add_etag()
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp.make_conditional(request)
+
 # API: Regions
 @app.route('/api/regions', methods=['GET', 'POST'])
 @login_required
@@ -761,19 +1143,26 @@ def api_regions():
         db.session.commit()
         return jsonify({'success': True, 'id': region.id})
     
-    regions = Region.query.filter_by(tenant_id=tenant.id).order_by(Region.name).all()
-    return jsonify([{'id': r.id, 'name': r.name} for r in regions])
+    return lookup_response(get_lookup_list(Region, tenant.id, lambda r: {'id': r.id, 'name': r.name}))
 
 @app.route('/api/regions/<int:id>', methods=['PUT', 'DELETE'])
 @login_required
 def api_region(id):
-    region = Region.query.get_or_404(id)
+    tenant = get_current_tenant()
     
     if request.method == 'DELETE':
-        db.session.delete(region)
+        # Detach partners in one UPDATE instead of loading them through the backref
+        Region.query.with_entities(Region.id).filter_by(id=id, tenant_id=tenant.id).first_or_404()
+        db.session.execute(update(Partner).where(Partner.region_id == id).values(region_id=None))
+        db.session.execute(delete(Region).where(Region.id == id))
         db.session.commit()
+        invalidate_lookup_cache(('Region', tenant.id))
+        stats_cache.clear()
+        ai_response_cache.clear()
         return jsonify({'success': True})
     
+    region = Region.query.get_or_404(id)
+    
     if request.method == 'PUT':
         data = request.json
         region.name = data.get('name', region.name)
@@ -793,20 +1182,24 @@ def api_tsds():
         db.session.commit()
         return jsonify({'success': True, 'id': tsd.id})
     
-    tsds = TSD.query.filter_by(tenant_id=tenant.id).order_by(TSD.name).all()
-    return jsonify([{'id': t.id, 'name': t.name} for t in tsds])
+    return lookup_response(get_lookup_list(TSD, tenant.id, lambda t: {'id': t.id, 'name': t.name}))
 
 @app.route('/api/tsds/<int:id>', methods=['PUT', 'DELETE'])
 @login_required
 def api_tsd(id):
     tenant = get_current_tenant()
-    tsd = TSD.query.filter_by(id=id, tenant_id=tenant.id).first_or_404()
     
     if request.method == 'DELETE':
-        db.session.delete(tsd)
+        TSD.query.with_entities(TSD.id).filter_by(id=id, tenant_id=tenant.id).first_or_404()
+        db.session.execute(update(Partner).where(Partner.tsd_id == id).values(tsd_id=None))
+        db.session.execute(delete(TSD).where(TSD.id == id))
         db.session.commit()
+        invalidate_lookup_cache(('TSD', tenant.id))
+        ai_response_cache.clear()
         return jsonify({'success': True})
     
+    tsd = TSD.query.filter_by(id=id, tenant_id=tenant.id).first_or_404()
+    
     if request.method == 'PUT':
         data = request.json
         tsd.name = data.get('name', tsd.name)
@@ -826,20 +1219,23 @@ def api_products():
         db.session.commit()
         return jsonify({'success': True, 'id': product.id})
     
-    products = Product.query.filter_by(tenant_id=tenant.id).order_by(Product.name).all()
-    return jsonify([{'id': p.id, 'name': p.name} for p in products])
+    return lookup_response(get_lookup_list(Product, tenant.id, lambda p: {'id': p.id, 'name': p.name}))
 
 @app.route('/api/products/<int:id>', methods=['PUT', 'DELETE'])
 @login_required
 def api_product(id):
     tenant = get_current_tenant()
-    product = Product.query.filter_by(id=id, tenant_id=tenant.id).first_or_404()
     
     if request.method == 'DELETE':
-        db.session.delete(product)
+        Product.query.with_entities(Product.id).filter_by(id=id, tenant_id=tenant.id).first_or_404()
+        db.session.execute(delete(partner_products).where(partner_products.c.product_id == id))
+        db.session.execute(delete(Product).where(Product.id == id))
         db.session.commit()
+        invalidate_lookup_cache(('Product', tenant.id))
         return jsonify({'success': True})
     
+    product = Product.query.filter_by(id=id, tenant_id=tenant.id).first_or_404()
+    
     if request.method == 'PUT':
         data = request.json
         product.name = data.get('name', product.name)
@@ -860,20 +1256,23 @@ def api_tags():
         db.session.commit()
         return jsonify({'success': True, 'id': tag.id})
     
-    tags = Tag.query.filter_by(tenant_id=tenant.id).order_by(Tag.name).all()
-    return jsonify([{'id': t.id, 'name': t.name, 'color': t.color} for t in tags])
+    return lookup_response(get_lookup_list(Tag, tenant.id, lambda t: {'id': t.id, 'name': t.name, 'color': t.color}))
 
 @app.route('/api/tags/<int:id>', methods=['PUT', 'DELETE'])
 @login_required
 def api_tag(id):
     tenant = get_current_tenant()
-    tag = Tag.query.filter_by(id=id, tenant_id=tenant.id).first_or_404()
     
     if request.method == 'DELETE':
-        db.session.delete(tag)
+        Tag.query.with_entities(Tag.id).filter_by(id=id, tenant_id=tenant.id).first_or_404()
+        db.session.execute(delete(partner_tags).where(partner_tags.c.tag_id == id))
+        db.session.execute(delete(Tag).where(Tag.id == id))
         db.session.commit()
+        invalidate_lookup_cache(('Tag', tenant.id))
         return jsonify({'success': True})
     
+    tag = Tag.query.filter_by(id=id, tenant_id=tenant.id).first_or_404()
+    
     if request.method == 'PUT':
         data = request.json
         tag.name = data.get('name', tag.name)
@@ -891,77 +1290,215 @@ def api_message_search():
     if not query or len(query) < 2:
         return jsonify([])
     
-    # Get user's partners
+    # Get user's partners (kept by id so results don't re-fetch them one at a time)
     if user.is_admin:
-        partner_ids = [p.id for p in Partner.query.filter_by(tenant_id=user.tenant_id).all()]
+        partners = {p.id: p for p in Partner.query.filter_by(tenant_id=user.tenant_id).all()}
     else:
-        partner_ids = [p.id for p in Partner.query.filter_by(user_id=user.id).all()]
+        partners = {p.id: p for p in Partner.query.filter_by(user_id=user.id).all()}
     
     search_term = f"%{query}%"
     messages = Message.query.filter(
         Message.body.ilike(search_term),
-        Message.partner_id.in_(partner_ids)
+        Message.partner_id.in_(list(partners))
     ).order_by(Message.created_at.desc()).limit(50).all()
     
     results = []
     for m in messages:
-        partner = Partner.query.get(m.partner_id)
+        partner = partners.get(m.partner_id)
         results.append({
             'id': m.id,
             'partner_id': m.partner_id,
             'partner_name': partner.full_name if partner else 'Unknown',
             'direction': m.direction,
             'body': m.body,
-            'created_at': m.created_at.isoformat()
+            'created_at': m.created_at
         })
     
     return jsonify(results)
 
-# AI: Get Anthropic client
+# AI: Get Anthropic client (one per process, so its HTTP connection pool is reused across requests)
+ai_client = None
+
 def get_ai_client():
-    if ANTHROPIC_API_KEY:
-        return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    return None
+    global ai_client
+    if ai_client is None and ANTHROPIC_API_KEY:
+        ai_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    return ai_client
+
+# AI: Rendered knowledge context and settings are cached until the underlying rows change. The knowledge
+# context checks a watermark on every read; settings are dropped once a write commits, with a version (as
+# for lookup lists) so a read that raced the commit doesn't store the old value.
+ai_knowledge_context_cache = {}
+ai_settings_cache = {}
+ai_settings_cache_version = 0
+
+def invalidate_ai_settings_cache():
+    global ai_settings_cache_version
+    ai_settings_cache_version += 1
+    ai_settings_cache.clear()
+
+@event.listens_for(AISettings, 'after_insert')
+@event.listens_for(AISettings, 'after_update')
+@event.listens_for(AISettings, 'after_delete')
+def clear_ai_settings_cache(mapper, connection, target):
+    clear_after_commit(target, invalidate_ai_settings_cache)
+
+# AI: Dashboard recommendations (next actions, ghost alerts) are reused for a few minutes while no
+# messages arrive and no partner changes. Partner, region, knowledge and AI settings edits go through the
+# ORM and clear the cache once committed (the Core region/TSD deletes clear it themselves); the newest
+# message id catches sends and webhooks, and the partner count catches deletes (the only way messages
+# disappear). Both come straight off indexes, so checking is cheap.
+AI_RESPONSE_CACHE_TTL = timedelta(minutes=5)
+ai_response_cache = {}
+
+@event.listens_for(Partner, 'after_insert')
+@event.listens_for(Partner, 'after_update')
+@event.listens_for(Partner, 'after_delete')
+@event.listens_for(Region, 'after_update')
+@event.listens_for(AIKnowledge, 'after_insert')
+@event.listens_for(AIKnowledge, 'after_update')
+@event.listens_for(AIKnowledge, 'after_delete')
+@event.listens_for(AISettings, 'after_insert')
+@event.listens_for(AISettings, 'after_update')
+@event.listens_for(AISettings, 'after_delete')
+def clear_ai_response_cache(mapper, connection, target):
+    clear_after_commit(target, ai_response_cache.clear)
+
+def cache_ai_response(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = (f.__name__, session.get('user_id'))
+        watermark = tuple(db.session.query(
+            func.max(Message.id),
+            db.session.query(func.count(Partner.id)).scalar_subquery()
+        ).one())
+        cached = ai_response_cache.get(key)
+        if cached and cached[0] == watermark and cached[1] > datetime.utcnow():
+            return jsonify(cached[2])
+        
+        response = f(*args, **kwargs)
+        # Errors come back as (response, status) tuples and are never cached; views that fall back to a
+        # degraded 200 (e.g. the AI call failed) set g.skip_ai_cache so the next request retries
+        if not isinstance(response, tuple) and not g.get('skip_ai_cache'):
+            ai_response_cache[key] = (watermark, datetime.utcnow() + AI_RESPONSE_CACHE_TTL, response.get_json())
+        return response
+    return decorated_function
 
 # AI: Get all knowledge for context (tenant-aware)
 def get_ai_knowledge_context(tenant_id=None, user=None):
+    # The rendered text is reused until the rows change, so the prompt prefix stays byte-identical and
+    # Anthropic's prompt cache keeps hitting. The watermark also catches writes made outside the ORM
+    # or by another process, and since it is read before the rows, a write that commits in between only
+    # causes one extra rebuild rather than a stale entry.
+    query = db.session.query(func.count(AIKnowledge.id), func.max(AIKnowledge.id), func.max(AIKnowledge.updated_at))
     if tenant_id:
-        knowledge_items = AIKnowledge.query.filter_by(tenant_id=tenant_id).all()
-    else:
-        knowledge_items = AIKnowledge.query.all()
+        query = query.filter(AIKnowledge.tenant_id == tenant_id)
+    watermark = tuple(query.one())
+    
+    cached = ai_knowledge_context_cache.get(tenant_id)
+    if cached is None or cached[0] != watermark:
+        cached = (watermark, build_ai_knowledge_context(tenant_id))
+        ai_knowledge_context_cache[tenant_id] = cached
+    return cached[1]
+
+KNOWLEDGE_CATEGORY_LABELS = {
+    'products': 'PRODUCTS & SERVICES',
+    'objections': 'COMMON OBJECTIONS & RESPONSES',
+    'faq': 'FREQUENTLY ASKED QUESTIONS',
+    'tone': 'COMMUNICATION STYLE & TONE',
+    'general': 'GENERAL BUSINESS INFO'
+}
+
+def build_ai_knowledge_context(tenant_id=None):
+    # Sorted by category in SQL so rows can be grouped as they stream past
+    query = AIKnowledge.query.order_by(AIKnowledge.category, AIKnowledge.id)
+    if tenant_id:
+        query = query.filter_by(tenant_id=tenant_id)
+    knowledge_items = query.all()
     
     if not knowledge_items:
         return ""
     
-    context = "\n\n=== BUSINESS KNOWLEDGE BASE ===\n"
-    
-    # Group by category
-    categories = {}
-    for item in knowledge_items:
-        if item.category not in categories:
-            categories[item.category] = []
-        categories[item.category].append(item)
-    
-    category_labels = {
-        'products': 'PRODUCTS & SERVICES',
-        'objections': 'COMMON OBJECTIONS & RESPONSES',
-        'faq': 'FREQUENTLY ASKED QUESTIONS',
-        'tone': 'COMMUNICATION STYLE & TONE',
-        'general': 'GENERAL BUSINESS INFO'
-    }
-    
-    for cat, items in categories.items():
-        label = category_labels.get(cat, cat.upper())
-        context += f"\n--- {label} ---\n"
+    context = io.StringIO()
+    context.write("\n\n=== BUSINESS KNOWLEDGE BASE ===\n")
+    for cat, items in groupby(knowledge_items, key=lambda item: item.category):
+        label = KNOWLEDGE_CATEGORY_LABELS.get(cat, cat.upper())
+        context.write(f"\n--- {label} ---\n")
         for item in items:
-            context += f"\n**{item.title}**\n{item.content}\n"
+            context.write(f"\n**{item.title}**\n{item.content}\n")
     
-    return context
+    return context.getvalue()
 
 # AI: Get settings
 def get_ai_setting(key, default=''):
-    setting = AISettings.query.filter_by(setting_key=key).first()
-    return setting.setting_value if setting else default
+    if key in ai_settings_cache:
+        value = ai_settings_cache[key]
+    else:
+        version = ai_settings_cache_version
+        setting = AISettings.query.filter_by(setting_key=key).first()
+        value = setting.setting_value if setting else None
+        if version == ai_settings_cache_version:
+            ai_settings_cache[key] = value
+    return value if value is not None else default
+
+# Last N messages of a thread in chronological order, in one query (rows of direction, body)
+def get_recent_messages(partner_id, limit=10):
+    latest = db.session.query(Message.direction, Message.body, Message.created_at).filter(
+        Message.partner_id == partner_id
+    ).order_by(Message.created_at.desc()).limit(limit).subquery()
+    return db.session.query(latest.c.direction, latest.c.body).order_by(latest.c.created_at.asc()).all()
+
+# Newest `limit` messages of each partner in one query, as {partner_id: [rows, newest first]}.
+# Rows carry direction, body, media_url and created_at rather than full Message objects; callers that
+# only show a preview pass body_chars so long bodies are cut down in the database.
+def get_recent_messages_by_partner(partner_ids, limit, body_chars=None):
+    ranked = db.session.query(
+        Message.partner_id, Message.direction, Message.body, Message.media_url, Message.created_at,
+        func.row_number().over(partition_by=Message.partner_id, order_by=(Message.created_at.desc(), Message.id.desc())).label('rn')
+    ).filter(Message.partner_id.in_(partner_ids)).subquery()
+    body = func.substr(ranked.c.body, 1, body_chars).label('body') if body_chars else ranked.c.body
+    messages = db.session.query(
+        ranked.c.partner_id, ranked.c.direction, body, ranked.c.media_url, ranked.c.created_at
+    ).filter(ranked.c.rn <= limit).order_by(ranked.c.partner_id, ranked.c.rn).all()
+    return {pid: list(msgs) for pid, msgs in groupby(messages, key=lambda m: m.partner_id)}
+
+# SQL expression for the hours between two timestamp columns (Postgres in production, SQLite locally)
+def hours_between(start, end):
+    if db.engine.dialect.name == 'postgresql':
+        return extract('epoch', end - start) / 3600
+    return (func.julianday(end) - func.julianday(start)) * 24
+
+# AI: Stable prompt text goes in system blocks marked as prompt-cache breakpoints. The knowledge base comes
+# first so every endpoint shares one cached prefix; only the per-request user message is billed in full.
+def ai_system_blocks(instructions, knowledge=''):
+    blocks = []
+    if knowledge:
+        blocks.append({'type': 'text', 'text': knowledge.strip(), 'cache_control': {'type': 'ephemeral'}})
+    blocks.append({'type': 'text', 'text': instructions, 'cache_control': {'type': 'ephemeral'}})
+    return blocks
+
+# AI: Replies sometimes wrap the JSON in a ```json fence or a sentence of prose
+AI_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)\s*```', re.DOTALL)
+
+def parse_ai_json(text):
+    match = AI_JSON_FENCE_RE.search(text)
+    if match:
+        text = match.group(1)
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # Fall back to the first array/object embedded in the text
+        starts = [i for i in (text.find('['), text.find('{')) if i >= 0]
+        if not starts:
+            raise
+        return json.JSONDecoder().raw_decode(text, min(starts))[0]
+
+AI_SUGGESTIONS_INSTRUCTIONS = """You are helping a Strategic Partner Manager at SilverSky (a cybersecurity company) respond to SMS messages from channel partners.
+
+Generate exactly 3 short, professional SMS reply suggestions (under 160 characters each) that the partner manager could send next. Make them contextually relevant to the conversation. Use the business knowledge above to give accurate, informed responses. Be helpful, friendly, and action-oriented.
+
+Return ONLY a JSON array of 3 strings, no other text. Example: ["Reply 1", "Reply 2", "Reply 3"]"""
 
 # AI: Generate reply suggestions based on conversation
 @app.route('/api/ai/suggestions/<int:partner_id>', methods=['POST'])
@@ -971,9 +1508,8 @@ def api_ai_suggestions(partner_id):
     if not client:
         return jsonify({'error': 'AI not configured. Add ANTHROPIC_API_KEY to environment.'}), 400
     
-    partner = Partner.query.get_or_404(partner_id)
-    messages = Message.query.filter_by(partner_id=partner_id).order_by(Message.created_at.desc()).limit(10).all()
-    messages.reverse()  # Chronological order
+    partner = Partner.query.options(joinedload(Partner.region), selectinload(Partner.products)).get_or_404(partner_id)
+    messages = get_recent_messages(partner_id)
     
     if not messages:
         return jsonify({'suggestions': ['Hi! How can I help you today?', 'Thanks for reaching out!', 'Let me know if you have any questions.']})
@@ -989,10 +1525,8 @@ def api_ai_suggestions(partner_id):
     # Get business knowledge
     knowledge = get_ai_knowledge_context()
     
-    prompt = f"""You are helping a Strategic Partner Manager at SilverSky (a cybersecurity company) respond to SMS messages from channel partners.
-{knowledge}
-
-Partner info:
+    system = ai_system_blocks(AI_SUGGESTIONS_INSTRUCTIONS, knowledge)
+    prompt = f"""Partner info:
 - Name: {partner.full_name}
 - Company: {partner.company or 'Unknown'}
 - Region: {partner.region.name if partner.region else 'Unknown'}
@@ -1000,22 +1534,26 @@ Partner info:
 - Notes: {partner.notes or 'None'}
 
 Recent conversation:
-{conversation_text}
-
-Generate exactly 3 short, professional SMS reply suggestions (under 160 characters each) that the partner manager could send next. Make them contextually relevant to the conversation. Use the business knowledge above to give accurate, informed responses. Be helpful, friendly, and action-oriented.
+{conversation_text}"""
 
-Return ONLY a JSON array of 3 strings, no other text. Example: ["Reply 1", "Reply 2", "Reply 3"]"""
+    # Clients that accept an event stream get each suggestion as soon as the model finishes writing it
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        return Response(
+            stream_ai_suggestions(client, system, prompt),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
     try:
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=300,
+            system=system,
             messages=[{"role": "user", "content": prompt}]
         )
         
         # Parse the response
-        response_text = response.content[0].text.strip()
-        suggestions = json.loads(response_text)
+        suggestions = parse_ai_json(response.content[0].text)
         
         return jsonify({'suggestions': suggestions[:3]})
     except json.JSONDecodeError:
@@ -1024,6 +1562,61 @@ Return ONLY a JSON array of 3 strings, no other text. Example: ["Reply 1", "Repl
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def stream_ai_suggestions(client, system, prompt):
+    """Yield SSE events for each suggestion string as it completes in the streamed JSON array"""
+    def event(payload):
+        return f"data: {json.dumps(payload)}\n\n"
+    
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = None  # Index just past the opening bracket or the last parsed suggestion
+    sent = 0
+    try:
+        with client.messages.stream(
+            model="claude-sonnet-4-20250514",
+            max_tokens=300,
+            system=system,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            for text in stream.text_stream:
+                buffer += text
+                if pos is None:
+                    start = buffer.find('[')
+                    if start == -1:
+                        continue
+                    pos = start + 1
+                
+                while sent < 3:
+                    while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                        pos += 1
+                    if pos >= len(buffer) or buffer[pos] != '"':
+                        break
+                    try:
+                        suggestion, pos = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        break  # String still arriving
+                    sent += 1
+                    yield event({'suggestion': suggestion})
+                
+                if sent >= 3:
+                    break
+    except Exception as e:
+        if not sent:
+            yield event({'error': str(e)})
+            return
+    
+    if not sent:
+        # Model didn't return a JSON array, fall back to the same defaults as the JSON endpoint
+        for suggestion in ['Thanks for the update!', 'Let me look into that for you.', 'Can we schedule a quick call?']:
+            yield event({'suggestion': suggestion})
+    yield event({'done': True})
+
+AI_COMPOSE_INSTRUCTIONS = """You are helping a Strategic Partner Manager at SilverSky (a cybersecurity company) write SMS messages to channel partners.
+
+Write a professional, friendly SMS message (under 160 characters if possible, max 320 characters). Use the business knowledge above to be accurate and specific. Use {{first_name}} if you want to personalize with the partner's name.
+
+Return ONLY the message text, no quotes or explanation."""
+
 # AI: Generate message based on prompt
 @app.route('/api/ai/compose', methods=['POST'])
 @login_required
@@ -1042,7 +1635,9 @@ def api_ai_compose():
     # Get partner context if provided
     partner_context = ""
     if partner_id:
-        partner = Partner.query.get(partner_id)
+        partner = Partner.query.options(
+            joinedload(Partner.region), joinedload(Partner.tsd), selectinload(Partner.products)
+        ).get(partner_id)
         if partner:
             partner_context = f"""
 Partner info:
@@ -1057,20 +1652,14 @@ Partner info:
     # Get business knowledge
     knowledge = get_ai_knowledge_context()
     
-    prompt = f"""You are helping a Strategic Partner Manager at SilverSky (a cybersecurity company) write SMS messages to channel partners.
-{knowledge}
-{partner_context}
-
-User request: {prompt_text}
-
-Write a professional, friendly SMS message (under 160 characters if possible, max 320 characters). Use the business knowledge above to be accurate and specific. Use {{{{first_name}}}} if you want to personalize with the partner's name.
-
-Return ONLY the message text, no quotes or explanation."""
+    prompt = f"""{partner_context}
+User request: {prompt_text}""".strip()
 
     try:
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=200,
+            system=ai_system_blocks(AI_COMPOSE_INSTRUCTIONS, knowledge),
             messages=[{"role": "user", "content": prompt}]
         )
         
@@ -1092,7 +1681,9 @@ def api_ai_summarize(partner_id):
         return jsonify({'error': 'AI not configured. Add ANTHROPIC_API_KEY to environment.'}), 400
     
     partner = Partner.query.get_or_404(partner_id)
-    messages = Message.query.filter_by(partner_id=partner_id).order_by(Message.created_at).all()
+    messages = Message.query.filter_by(partner_id=partner_id).order_by(Message.created_at).with_entities(
+        Message.direction, Message.body
+    ).all()
     
     if not messages:
         return jsonify({'summary': 'No conversation history yet.'})
@@ -1137,7 +1728,7 @@ def api_ai_sentiment(partner_id):
     if not client:
         return jsonify({'error': 'AI not configured'}), 400
     
-    messages = Message.query.filter_by(partner_id=partner_id, direction='inbound').order_by(Message.created_at.desc()).limit(5).all()
+    messages = Message.query.filter_by(partner_id=partner_id, direction='inbound').order_by(Message.created_at.desc()).limit(5).with_entities(Message.body).all()
     
     if not messages:
         return jsonify({'sentiment': 'neutral', 'score': 50, 'label': 'No messages yet'})
@@ -1162,19 +1753,22 @@ Example: {{"sentiment": "positive", "score": 75, "label": "Interested"}}"""
             messages=[{"role": "user", "content": prompt}]
         )
         
-        result = json.loads(response.content[0].text.strip())
+        result = parse_ai_json(response.content[0].text)
         return jsonify(result)
     except:
         return jsonify({'sentiment': 'neutral', 'score': 50, 'label': 'Unknown'})
 
+# datetime.weekday() -> name (strftime('%A') is locale-dependent and slower per row)
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
 # AI: Predict best time to text a partner
 @app.route('/api/ai/best-time/<int:partner_id>')
 @login_required
 def api_ai_best_time(partner_id):
-    partner = Partner.query.get_or_404(partner_id)
+    Partner.query.options(load_only(Partner.id)).get_or_404(partner_id)
     
     # Get inbound messages (their responses) with timestamps
-    responses = Message.query.filter_by(partner_id=partner_id, direction='inbound').all()
+    responses = Message.query.filter_by(partner_id=partner_id, direction='inbound').with_entities(Message.created_at).all()
     
     if len(responses) < 2:
         return jsonify({
@@ -1185,19 +1779,12 @@ def api_ai_best_time(partner_id):
         })
     
     # Analyze response times
-    hours = {}
-    days = {}
-    
-    for msg in responses:
-        hour = msg.created_at.hour
-        day = msg.created_at.strftime('%A')
-        
-        hours[hour] = hours.get(hour, 0) + 1
-        days[day] = days.get(day, 0) + 1
+    hours = Counter(msg.created_at.hour for msg in responses)
+    days = Counter(msg.created_at.weekday() for msg in responses)
     
     # Find peaks
-    best_hour = max(hours, key=hours.get) if hours else 10
-    best_day = max(days, key=days.get) if days else 'Tuesday'
+    best_hour = hours.most_common(1)[0][0]
+    best_day = WEEKDAY_NAMES[days.most_common(1)[0][0]]
     
     # Format time nicely
     if best_hour < 12:
@@ -1216,46 +1803,61 @@ def api_ai_best_time(partner_id):
         'response_count': len(responses),
         'confidence': confidence,
         'hour_breakdown': hours,
-        'day_breakdown': days
+        'day_breakdown': {WEEKDAY_NAMES[day]: count for day, count in days.items()}
     })
 
+AI_GHOST_FOLLOW_UP_INSTRUCTIONS = """Write short, friendly SMS follow-ups for partners who haven't responded to our last message.
+
+You'll get a JSON list of partners with how many days they've been silent and the last message we sent them.
+
+Keep each message under 160 characters. Be casual, not pushy. Don't guilt them. Maybe add value or give them an easy out.
+
+Return ONLY a JSON array with one object per partner, no other text. Example:
+[{"partner_id": 1, "message": "Hey! No rush on this - happy to send a quick summary if that's easier."}]"""
+
 # AI: Ghost Alert - Find partners who've gone silent
 @app.route('/api/ai/ghost-alerts')
 @login_required
+@cache_ai_response
 def api_ai_ghost_alerts():
     client = get_ai_client()
     
     ghosts = []
-    partners = Partner.query.filter_by(archived=False, opted_out=False).all()
+    
+    # Only partners whose last message was from us (they haven't replied) can be ghosting
+    ranked = db.session.query(
+        Message.partner_id, Message.direction,
+        func.row_number().over(partition_by=Message.partner_id, order_by=(Message.created_at.desc(), Message.id.desc())).label('rn')
+    ).subquery()
+    awaiting_reply = db.session.query(ranked.c.partner_id).filter(ranked.c.rn == 1, ranked.c.direction == 'outbound')
+    partner_query = Partner.query.filter(Partner.archived == False, Partner.opted_out == False, Partner.id.in_(awaiting_reply))
+    partners = partner_query.all()
+    partner_ids = [partner.id for partner in partners]
+    last_messages = get_recent_messages_by_partner(partner_ids, 1, body_chars=100)
+    
+    # Their typical response time: each inbound message against the latest outbound one before it, within a week
+    previous_outbound = func.max(case((Message.direction == 'outbound', Message.created_at))).over(
+        partition_by=Message.partner_id, order_by=(Message.created_at, Message.id), rows=(None, -1)
+    )
+    replies = db.session.query(
+        Message.partner_id, Message.direction, Message.created_at, previous_outbound.label('previous_outbound')
+    ).filter(Message.partner_id.in_(partner_ids)).subquery()
+    response_hours = hours_between(replies.c.previous_outbound, replies.c.created_at)
+    avg_response_by_partner = dict(db.session.query(replies.c.partner_id, func.avg(response_hours)).filter(
+        replies.c.direction == 'inbound', response_hours > 0, response_hours < 168
+    ).group_by(replies.c.partner_id).all())
     
     for partner in partners:
-        # Get their messages
-        messages = Message.query.filter_by(partner_id=partner.id).order_by(Message.created_at.desc()).all()
-        
-        if not messages:
+        # A reply that landed after the partner query means they're no longer waiting on us
+        recent = last_messages.get(partner.id)
+        if not recent or recent[0].direction != 'outbound':
             continue
+        last_msg = recent[0]
         
-        # Check if last message was from us (they haven't replied)
-        last_msg = messages[0]
-        if last_msg.direction != 'outbound':
-            continue
-        
-        # Calculate their typical response time
-        response_times = []
-        for i, msg in enumerate(messages[:-1]):
-            if msg.direction == 'inbound':
-                # Find the outbound message before this
-                for prev_msg in messages[i+1:]:
-                    if prev_msg.direction == 'outbound':
-                        delta = (msg.created_at - prev_msg.created_at).total_seconds() / 3600  # hours
-                        if delta > 0 and delta < 168:  # within a week
-                            response_times.append(delta)
-                        break
-        
-        if not response_times:
-            avg_response_hours = 48  # default assumption
+        if partner.id in avg_response_by_partner:
+            avg_response_hours = float(avg_response_by_partner[partner.id])
         else:
-            avg_response_hours = sum(response_times) / len(response_times)
+            avg_response_hours = 48  # default assumption
         
         # How long since we messaged them?
         hours_waiting = (datetime.utcnow() - last_msg.created_at).total_seconds() / 3600
@@ -1280,42 +1882,70 @@ def api_ai_ghost_alerts():
     
     # Generate re-engagement messages with AI if we have a client
     if client and ghosts:
-        for ghost in ghosts[:5]:  # Only generate for top 5 to save API calls
-            try:
-                prompt = f"""Write a short, friendly SMS follow-up for someone who hasn't responded in {ghost['days_waiting']} days.
+        top_ghosts = ghosts[:5]  # Only generate for top 5 to save tokens
+        suggestions = {}
+        try:
+            # One call for all of them instead of one per ghost
+            prompt = json.dumps([{
+                'partner_id': g['partner_id'],
+                'days_waiting': g['days_waiting'],
+                'last_message': g['last_message']
+            } for g in top_ghosts], indent=2)
+            
+            response = client.messages.create(
+                model="claude-sonnet-4-20250514",
+                max_tokens=500,
+                system=ai_system_blocks(AI_GHOST_FOLLOW_UP_INSTRUCTIONS),
+                messages=[{"role": "user", "content": prompt}]
+            )
+            
+            for item in parse_ai_json(response.content[0].text):
+                suggestions[item['partner_id']] = item['message'].strip().strip('"')
+        except Exception as e:
+            print(f"Ghost follow-up generation error: {e}")
+            g.skip_ai_cache = True
+        
+        for ghost in top_ghosts:
+            ghost['suggested_message'] = suggestions.get(ghost['partner_id'], "Hey, just floating this back up - any thoughts?")
+    
+    return jsonify(ghosts)
 
-Last message sent to them: "{ghost['last_message']}"
+AI_NEXT_ACTIONS_INSTRUCTIONS = """You're a sales AI assistant. Analyze these partners and recommend the top 5 actions for today.
 
-Keep it under 160 characters. Be casual, not pushy. Don't guilt them. Maybe add value or give them an easy out.
+For each recommended action, provide:
+1. partner_id (number)
+2. priority: "high", "medium", or "low"  
+3. reason: Brief explanation why (under 50 chars)
+4. action: What to do ("send intro", "follow up", "respond", "re-engage", "check in")
+5. suggested_message: A ready-to-send SMS (under 160 chars)
 
-Return ONLY the message text."""
+Consider:
+- Partners awaiting our response (needs_response) are highest priority
+- Never contacted partners are opportunities
+- Don't let good conversations go cold
+- Warm leads need nurturing
 
-                response = client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=100,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                ghost['suggested_message'] = response.content[0].text.strip().strip('"')
-            except:
-                ghost['suggested_message'] = f"Hey, just floating this back up - any thoughts?"
-    
-    return jsonify(ghosts)
+Return ONLY a JSON array of 5 action objects. Example:
+[{"partner_id": 1, "priority": "high", "reason": "They asked a question 2 days ago", "action": "respond", "suggested_message": "Hey! Great question about pricing..."}]"""
 
 # AI: Next Best Action - Who to text today and what to say
 @app.route('/api/ai/next-actions')
 @login_required
+@cache_ai_response
 def api_ai_next_actions():
     client = get_ai_client()
     if not client:
         return jsonify({'error': 'AI not configured'}), 400
     
     actions = []
-    partners = Partner.query.filter_by(archived=False, opted_out=False).all()
+    partner_query = Partner.query.filter_by(archived=False, opted_out=False)
+    partners = partner_query.options(joinedload(Partner.region)).all()
+    recent_by_partner = get_recent_messages_by_partner(partner_query.with_entities(Partner.id).scalar_subquery(), 5, body_chars=100)
     
     partner_data = []
     
     for partner in partners:
-        messages = Message.query.filter_by(partner_id=partner.id).order_by(Message.created_at.desc()).limit(5).all()
+        messages = recent_by_partner.get(partner.id)
         
         if not messages:
             # Never contacted - potential action
@@ -1349,47 +1979,23 @@ def api_ai_next_actions():
     # Use AI to prioritize and suggest actions
     knowledge = get_ai_knowledge_context()
     
-    prompt = f"""You're a sales AI assistant. Analyze these partners and recommend the top 5 actions for today.
-{knowledge}
-
-Partner data:
-{json.dumps(partner_data[:30], indent=2)}
-
-For each recommended action, provide:
-1. partner_id (number)
-2. priority: "high", "medium", or "low"  
-3. reason: Brief explanation why (under 50 chars)
-4. action: What to do ("send intro", "follow up", "respond", "re-engage", "check in")
-5. suggested_message: A ready-to-send SMS (under 160 chars)
-
-Consider:
-- Partners awaiting our response (needs_response) are highest priority
-- Never contacted partners are opportunities
-- Don't let good conversations go cold
-- Warm leads need nurturing
-
-Return ONLY a JSON array of 5 action objects. Example:
-[{{"partner_id": 1, "priority": "high", "reason": "They asked a question 2 days ago", "action": "respond", "suggested_message": "Hey! Great question about pricing..."}}]"""
+    prompt = f"""Partner data:
+{json.dumps(partner_data[:30], indent=2)}"""
 
     try:
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=1500,
+            system=ai_system_blocks(AI_NEXT_ACTIONS_INSTRUCTIONS, knowledge),
             messages=[{"role": "user", "content": prompt}]
         )
         
-        response_text = response.content[0].text.strip()
-        # Clean up if wrapped in code blocks
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-        
-        actions = json.loads(response_text)
+        actions = parse_ai_json(response.content[0].text)
         
-        # Enrich with partner details
+        # Enrich with partner details (every partner the AI saw is already loaded above)
+        partners_by_id = {p.id: p for p in partners}
         for action in actions:
-            partner = Partner.query.get(action['partner_id'])
+            partner = partners_by_id.get(action['partner_id'])
             if partner:
                 action['partner_name'] = partner.full_name
                 action['partner_company'] = partner.company
@@ -1421,8 +2027,8 @@ def api_ai_knowledge():
         'category': k.category,
         'title': k.title,
         'content': k.content,
-        'created_at': k.created_at.isoformat(),
-        'updated_at': k.updated_at.isoformat()
+        'created_at': k.created_at,
+        'updated_at': k.updated_at
     } for k in items])
 
 @app.route('/api/ai/knowledge/<int:id>', methods=['GET', 'PUT', 'DELETE'])
@@ -1606,6 +2212,30 @@ Format as a clear, actionable style guide in 150-250 words."""
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Page chrome dropped before extracting text from scraped pages
+SCRAPE_STRIP_TAGS = ["script", "style", "nav", "footer", "header"]
+# Most of a page is markup, so this leaves plenty for the 15k/5k characters of text we keep
+SCRAPE_MAX_BYTES = 1024 * 1024
+
+def fetch_scraped_page(url, headers, timeout):
+    """Download at most SCRAPE_MAX_BYTES of a page's HTML (as bytes, so the parser can detect the charset)"""
+    with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=16384):
+            body += chunk
+            if len(body) >= SCRAPE_MAX_BYTES:
+                break
+        return bytes(body[:SCRAPE_MAX_BYTES])
+
+def parse_scraped_page(html):
+    """Parse a scraped page and return (soup, visible text), one non-empty line per block"""
+    soup = BeautifulSoup(html, 'lxml')
+    for tag in soup.find_all(SCRAPE_STRIP_TAGS):
+        tag.decompose()
+    text = soup.get_text(separator='\n', strip=True)
+    return soup, '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
 # API: Scrape website for AI training
 @app.route('/api/ai/scrape', methods=['POST'])
 @login_required
@@ -1626,21 +2256,7 @@ def api_ai_scrape():
     try:
         # Scrape the main page
         headers = {'User-Agent': 'Mozilla/5.0 (compatible; SilverSkyBot/1.0)'}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text(separator='\n', strip=True)
-        
-        # Clean up text - remove extra whitespace
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        text = '\n'.join(lines)
+        soup, text = parse_scraped_page(fetch_scraped_page(url, headers, timeout=15))
         
         # Truncate if too long
         if len(text) > 15000:
@@ -1656,22 +2272,20 @@ def api_ai_scrape():
                 internal_links.add(full_url)
         
         # Scrape up to 5 additional pages
-        additional_content = []
-        for link in list(internal_links)[:5]:
+        def scrape_page(link):
             try:
-                resp = requests.get(link, headers=headers, timeout=10)
-                if resp.status_code == 200:
-                    page_soup = BeautifulSoup(resp.text, 'html.parser')
-                    for script in page_soup(["script", "style", "nav", "footer", "header"]):
-                        script.decompose()
-                    page_text = page_soup.get_text(separator='\n', strip=True)
-                    page_lines = [line.strip() for line in page_text.splitlines() if line.strip()]
-                    page_text = '\n'.join(page_lines)
-                    if len(page_text) > 5000:
-                        page_text = page_text[:5000]
-                    additional_content.append(f"\n\n--- Page: {link} ---\n{page_text}")
+                _, page_text = parse_scraped_page(fetch_scraped_page(link, headers, timeout=10))
+                if len(page_text) > 5000:
+                    page_text = page_text[:5000]
+                return f"\n\n--- Page: {link} ---\n{page_text}"
             except:
-                continue
+                pass
+            return None
+        
+        # The fetches are independent and mostly waiting on the network, so run them side by side
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            pages = executor.map(scrape_page, list(internal_links)[:5])
+            additional_content = [page for page in pages if page]
         
         all_content = text + ''.join(additional_content)
         
@@ -1706,14 +2320,7 @@ Return ONLY valid JSON array, no other text."""
         )
         
         # Parse AI response
-        response_text = ai_response.content[0].text.strip()
-        # Clean up response if needed
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-        
-        knowledge_items = json.loads(response_text)
+        knowledge_items = parse_ai_json(ai_response.content[0].text)
         
         # Save to database
         added = 0
@@ -1772,7 +2379,7 @@ def api_templates():
         'id': t.id,
         'name': t.name,
         'body': t.body,
-        'created_at': t.created_at.isoformat()
+        'created_at': t.created_at
     } for t in templates])
 
 @app.route('/api/templates/<int:id>', methods=['PUT', 'DELETE'])
@@ -1792,6 +2399,9 @@ def api_template(id):
         db.session.commit()
         return jsonify({'success': True})
 
+# The conversation list only shows a one-line preview of the latest message
+CONVERSATION_PREVIEW_CHARS = 200
+
 # API: Messages/Conversations
 @app.route('/api/conversations')
 @login_required
@@ -1800,62 +2410,87 @@ def api_conversations():
     show_archived = request.args.get('archived') == 'true'
     filter_unread = request.args.get('unread') == 'true'
     filter_has_media = request.args.get('has_media') == 'true'
+    # Optional paging (the dashboard only shows the first few); without a limit every conversation is returned
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
     
     # Filter by user (admins see all in tenant)
     if user.is_admin:
-        partners = Partner.query.filter_by(tenant_id=user.tenant_id, archived=show_archived).all()
+        partner_query = Partner.query.filter_by(tenant_id=user.tenant_id, archived=show_archived)
     else:
-        partners = Partner.query.filter_by(user_id=user.id, archived=show_archived).all()
+        partner_query = Partner.query.filter_by(user_id=user.id, archived=show_archived)
+    partner_ids = partner_query.with_entities(Partner.id).scalar_subquery()
+    
+    # Per-partner counts in one GROUP BY; the inner join keeps only partners with messages
+    stats = db.session.query(
+        Message.partner_id,
+        func.count(Message.id).label('total'),
+        func.sum(case((and_(Message.direction == 'inbound', Message.status == 'received'), 1), else_=0)).label('unread'),
+        func.count(Message.media_url).label('media'),
+        func.max(Message.created_at).label('latest_time')
+    ).filter(Message.partner_id.in_(partner_ids)).group_by(Message.partner_id).subquery()
+    
+    conversation_query = partner_query.join(stats, Partner.id == stats.c.partner_id)
+    if filter_unread:
+        conversation_query = conversation_query.filter(stats.c.unread > 0)
+    if filter_has_media:
+        conversation_query = conversation_query.filter(stats.c.media > 0)
+    # Pinned first, then most recent activity
+    conversation_query = conversation_query.order_by(
+        func.coalesce(Partner.pinned, False).desc(), stats.c.latest_time.desc(), Partner.id
+    )
     
-    conversations = []
+    total_count = None
+    if limit is not None:
+        total_count = conversation_query.count()
+        conversation_query = conversation_query.offset(offset).limit(limit)
     
-    for partner in partners:
-        latest = Message.query.filter_by(partner_id=partner.id).order_by(Message.created_at.desc()).first()
-        unread = Message.query.filter_by(partner_id=partner.id, direction='inbound', status='received').count()
-        total_messages = Message.query.filter_by(partner_id=partner.id).count()
-        has_any_media = Message.query.filter(Message.partner_id == partner.id, Message.media_url.isnot(None)).count() > 0
-        
-        if latest:  # Only show partners with messages
-            # Apply filters
-            if filter_unread and unread == 0:
-                continue
-            if filter_has_media and not has_any_media:
-                continue
-                
-            conversations.append({
-                'partner_id': partner.id,
-                'name': partner.full_name,
-                'first_name': partner.first_name,
-                'company': partner.company,
-                'phone': partner.phone,
-                'region': partner.region.name if partner.region else None,
-                'tsd': partner.tsd.name if partner.tsd else None,
-                'tags': [{'id': t.id, 'name': t.name, 'color': t.color} for t in partner.tags],
-                'notes': partner.notes,
-                'opted_out': partner.opted_out,
-                'pinned': partner.pinned if hasattr(partner, 'pinned') else False,
-                'archived': partner.archived if hasattr(partner, 'archived') else False,
-                'latest_message': latest.body,
-                'latest_time': latest.created_at.isoformat(),
-                'has_media': latest.media_url is not None,
-                'has_any_media': has_any_media,
-                'unread': unread,
-                'total_messages': total_messages,
-                'direction': latest.direction,
-                'last_contacted': partner.last_contacted.isoformat() if partner.last_contacted else None
-            })
+    rows = conversation_query.options(
+        joinedload(Partner.region), joinedload(Partner.tsd), selectinload(Partner.tags)
+    ).add_columns(stats.c.total, stats.c.unread, stats.c.media).all()
+    
+    # Latest message for just this page of partners
+    latest_by_partner = get_recent_messages_by_partner([partner.id for partner, _, _, _ in rows], 1, body_chars=CONVERSATION_PREVIEW_CHARS)
+    
+    conversations = []
     
-    # Sort: pinned first, then by latest time
-    conversations.sort(key=lambda x: (not x.get('pinned', False), x['latest_time']), reverse=True)
-    conversations.sort(key=lambda x: not x.get('pinned', False))
+    for partner, total_messages, unread, media_count in rows:
+        latest = latest_by_partner[partner.id][0]
+        has_any_media = media_count > 0
+        
+        conversations.append({
+            'partner_id': partner.id,
+            'name': partner.full_name,
+            'first_name': partner.first_name,
+            'company': partner.company,
+            'phone': partner.phone,
+            'region': partner.region.name if partner.region else None,
+            'tsd': partner.tsd.name if partner.tsd else None,
+            'tags': [{'id': t.id, 'name': t.name, 'color': t.color} for t in partner.tags],
+            'notes': partner.notes,
+            'opted_out': partner.opted_out,
+            'pinned': partner.pinned if hasattr(partner, 'pinned') else False,
+            'archived': partner.archived if hasattr(partner, 'archived') else False,
+            'latest_message': latest.body,
+            'latest_time': latest.created_at,
+            'has_media': latest.media_url is not None,
+            'has_any_media': has_any_media,
+            'unread': unread,
+            'total_messages': total_messages,
+            'direction': latest.direction,
+            'last_contacted': partner.last_contacted
+        })
     
-    return jsonify(conversations)
+    response = jsonify(conversations)
+    if total_count is not None:
+        response.headers['X-Total-Count'] = str(total_count)
+    return response
 
 # API: Pin/Unpin conversation
 @app.route('/api/partners/<int:id>/pin', methods=['POST'])
 @login_required
 def api_pin_partner(id):
-    partner = Partner.query.get_or_404(id)
+    partner = Partner.query.options(load_only(Partner.id, Partner.pinned)).get_or_404(id)
     partner.pinned = not partner.pinned
     db.session.commit()
     return jsonify({'success': True, 'pinned': partner.pinned})
@@ -1864,7 +2499,7 @@ def api_pin_partner(id):
 @app.route('/api/partners/<int:id>/archive', methods=['POST'])
 @login_required
 def api_archive_partner(id):
-    partner = Partner.query.get_or_404(id)
+    partner = Partner.query.options(load_only(Partner.id, Partner.archived)).get_or_404(id)
     partner.archived = not partner.archived
     db.session.commit()
     return jsonify({'success': True, 'archived': partner.archived})
@@ -1873,7 +2508,7 @@ def api_archive_partner(id):
 @app.route('/api/partners/<int:id>/notes', methods=['POST'])
 @login_required
 def api_update_notes(id):
-    partner = Partner.query.get_or_404(id)
+    partner = Partner.query.options(load_only(Partner.id)).get_or_404(id)
     data = request.json
     partner.notes = data.get('notes', '')
     db.session.commit()
@@ -1884,78 +2519,120 @@ def api_update_notes(id):
 @login_required
 def api_export_conversation(id):
     partner = Partner.query.get_or_404(id)
-    messages = Message.query.filter_by(partner_id=id).order_by(Message.created_at).all()
+    messages = Message.query.filter_by(partner_id=id).order_by(Message.created_at).with_entities(
+        Message.direction, Message.body, Message.created_at
+    )
     
     export_format = request.args.get('format', 'txt')
     
     if export_format == 'txt':
-        content = f"Conversation with {partner.full_name}\n"
-        content += f"Phone: {partner.phone}\n"
-        content += f"Company: {partner.company or 'N/A'}\n"
-        content += f"Exported: {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}\n"
-        content += "=" * 50 + "\n\n"
-        
-        for m in messages:
-            direction = "→ You" if m.direction == 'outbound' else f"← {partner.first_name}"
-            time = m.created_at.strftime('%Y-%m-%d %H:%M')
-            content += f"[{time}] {direction}:\n{m.body or '[Media]'}\n\n"
+        def generate():
+            yield (
+                f"Conversation with {partner.full_name}\n"
+                f"Phone: {partner.phone}\n"
+                f"Company: {partner.company or 'N/A'}\n"
+                f"Exported: {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}\n"
+                + "=" * 50 + "\n\n"
+            )
+            
+            for m in messages.yield_per(1000):
+                direction = "→ You" if m.direction == 'outbound' else f"← {partner.first_name}"
+                time = m.created_at.isoformat(' ', 'minutes')
+                yield f"[{time}] {direction}:\n{m.body or '[Media]'}\n\n"
         
         return Response(
-            content,
+            stream_with_context(generate()),
             mimetype='text/plain',
             headers={'Content-Disposition': f'attachment; filename=conversation_{partner.first_name}_{id}.txt'}
         )
     
     return jsonify({'error': 'Unsupported format'}), 400
 
+# Dashboard stats are reused for a minute while the watermark below is unchanged. It only uses cheap aggregates:
+# new messages move max(Message.id) and partner adds/deletes move the partner count. Opening a thread clears it
+# when replies get marked read; ORM edits to partners or regions clear it once they commit
+STATS_CACHE_TTL = timedelta(minutes=1)
+stats_cache = {}
+
+@event.listens_for(Partner, 'after_insert')
+@event.listens_for(Partner, 'after_update')
+@event.listens_for(Partner, 'after_delete')
+@event.listens_for(Region, 'after_insert')
+@event.listens_for(Region, 'after_update')
+@event.listens_for(Region, 'after_delete')
+def clear_stats_cache(mapper, connection, target):
+    clear_after_commit(target, stats_cache.clear)
+
 # API: Dashboard Stats
 @app.route('/api/stats')
 @login_required
 def api_stats():
-    from sqlalchemy import func
-    
+    key = session.get('user_id')
+    watermark = tuple(db.session.query(
+        func.max(Message.id), db.session.query(func.count(Partner.id)).scalar_subquery()
+    ).one())
+    cached = stats_cache.get(key)
+    if not (cached and cached[0] == watermark and cached[1] > datetime.utcnow()):
+        cached = (watermark, datetime.utcnow() + STATS_CACHE_TTL, build_dashboard_stats())
+        stats_cache[key] = cached
+    return lookup_response(cached[2])
+
+def build_dashboard_stats():
     now = datetime.utcnow()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     week_start = today_start - timedelta(days=now.weekday())
     month_start = today_start.replace(day=1)
     
-    # Total partners
-    total_partners = Partner.query.count()
-    
-    # Never contacted
-    never_contacted = Partner.query.filter(Partner.last_contacted.is_(None)).count()
-    
-    # Messages today
-    messages_today = Message.query.filter(Message.created_at >= today_start).count()
-    
-    # Messages this week
-    messages_week = Message.query.filter(Message.created_at >= week_start).count()
-    
-    # Messages sent (outbound) this week
-    sent_week = Message.query.filter(
-        Message.created_at >= week_start,
-        Message.direction == 'outbound'
-    ).count()
-    
-    # Replies received this week
-    replies_week = Message.query.filter(
-        Message.created_at >= week_start,
-        Message.direction == 'inbound'
-    ).count()
+    # Partner totals: all, never contacted, no region
+    total_partners, never_contacted, no_region = db.session.query(
+        func.count(Partner.id),
+        func.sum(case((Partner.last_contacted.is_(None), 1), else_=0)),
+        func.sum(case((Partner.region_id.is_(None), 1), else_=0))
+    ).one()
+    never_contacted = never_contacted or 0
+    no_region = no_region or 0
+    
+    # Days already rolled up come from MessageDailyStat; anything newer is counted live from messages.
+    # The window covers the current week and month (a week can start in the previous month).
+    window_start = min(week_start, month_start)
+    rolled_through = db.session.query(func.max(MessageDailyStat.day)).scalar()
+    live_start = window_start
+    if rolled_through:
+        live_start = max(live_start, datetime.combine(rolled_through + timedelta(days=1), datetime.min.time()))
+    
+    rolled_sent, rolled_replies = db.session.query(
+        func.sum(MessageDailyStat.outbound), func.sum(MessageDailyStat.inbound)
+    ).filter(MessageDailyStat.day >= week_start.date(), MessageDailyStat.day < live_start.date()).one()
+    
+    def count_since(start, *conditions):
+        return func.sum(case((and_(Message.created_at >= start, *conditions), 1), else_=0))
+    
+    live = db.session.query(
+        count_since(today_start).label('messages_today'),
+        count_since(week_start, Message.direction == 'outbound').label('sent_week'),
+        count_since(week_start, Message.direction == 'inbound').label('replies_week')
+    ).filter(Message.created_at >= live_start).one()
+    
+    messages_today = live.messages_today or 0
+    sent_week = (rolled_sent or 0) + (live.sent_week or 0)
+    replies_week = (rolled_replies or 0) + (live.replies_week or 0)
+    messages_week = sent_week + replies_week
     
     # Unread count
     unread = Message.query.filter_by(direction='inbound', status='received').count()
     
     # Response rate (partners who replied / partners messaged this month)
-    partners_messaged = db.session.query(func.count(func.distinct(Message.partner_id))).filter(
-        Message.created_at >= month_start,
-        Message.direction == 'outbound'
-    ).scalar() or 0
+    def partners_this_month(direction, stat_column):
+        rolled_ids = db.session.query(MessageDailyStat.partner_id).filter(
+            MessageDailyStat.day >= month_start.date(), MessageDailyStat.day < live_start.date(), stat_column > 0
+        )
+        live_ids = db.session.query(Message.partner_id).filter(
+            Message.created_at >= max(month_start, live_start), Message.direction == direction
+        )
+        return db.session.query(func.count()).select_from(rolled_ids.union(live_ids).subquery()).scalar()
     
-    partners_replied = db.session.query(func.count(func.distinct(Message.partner_id))).filter(
-        Message.created_at >= month_start,
-        Message.direction == 'inbound'
-    ).scalar() or 0
+    partners_messaged = partners_this_month('outbound', MessageDailyStat.outbound)
+    partners_replied = partners_this_month('inbound', MessageDailyStat.inbound)
     
     response_rate = round((partners_replied / partners_messaged * 100), 1) if partners_messaged > 0 else 0
     
@@ -1965,9 +2642,7 @@ def api_stats():
         func.count(Partner.id)
     ).outerjoin(Partner).group_by(Region.id, Region.name).all()
     
-    no_region = Partner.query.filter(Partner.region_id.is_(None)).count()
-    
-    return jsonify({
+    return {
         'total_partners': total_partners,
         'never_contacted': never_contacted,
         'messages_today': messages_today,
@@ -1977,19 +2652,51 @@ def api_stats():
         'unread': unread,
         'response_rate': response_rate,
         'partners_by_region': [{'name': r[0], 'count': r[1]} for r in region_stats] + ([{'name': 'No Region', 'count': no_region}] if no_region > 0 else [])
-    })
+    }
+
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 200
 
 @app.route('/api/messages/<int:partner_id>')
 @login_required
 def api_messages(partner_id):
-    messages = Message.query.filter_by(partner_id=partner_id).order_by(Message.created_at).all()
-    
-    for m in messages:
-        if m.direction == 'inbound' and m.status == 'received':
-            m.status = 'read'
+    # Optional keyset paging for long threads: ?limit=N returns the newest N messages and ?before=<message id>
+    # the ones before it. Messages always come back oldest first; X-Next-Cursor is the `before` for the next page.
+    limit = request.args.get('limit', type=int)
+    before = request.args.get('before', type=int)
+    
+    # Opening a thread marks its replies read, in one UPDATE before reading the messages back
+    marked = db.session.execute(
+        update(Message).where(
+            Message.partner_id == partner_id, Message.direction == 'inbound', Message.status == 'received'
+        ).values(status='read').execution_options(synchronize_session=False)
+    ).rowcount
     db.session.commit()
+    if marked:
+        stats_cache.clear()  # the stats watermark doesn't see read receipts; keep the unread badge current
     
-    return jsonify([{
+    query = Message.query.filter_by(partner_id=partner_id).options(load_only(
+        Message.id, Message.direction, Message.body, Message.media_url, Message.media_type,
+        Message.status, Message.ai_draft, Message.ai_draft_status, Message.created_at
+    ))
+    next_cursor = None
+    
+    if limit is None and before is None:
+        messages = query.order_by(Message.created_at).all()
+    else:
+        limit = max(1, min(limit or MESSAGES_PAGE_SIZE, MESSAGES_MAX_PAGE_SIZE))
+        if before:
+            cursor_time = db.session.query(Message.created_at).filter(Message.id == before).scalar_subquery()
+            query = query.filter(or_(
+                Message.created_at < cursor_time,
+                and_(Message.created_at == cursor_time, Message.id < before)
+            ))
+        page = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+        if len(page) > limit:
+            next_cursor = page[limit - 1].id
+        messages = page[:limit][::-1]
+    
+    response = jsonify([{
         'id': m.id,
         'direction': m.direction,
         'body': m.body,
@@ -1998,8 +2705,11 @@ def api_messages(partner_id):
         'status': m.status,
         'ai_draft': m.ai_draft,
         'ai_draft_status': m.ai_draft_status,
-        'created_at': m.created_at.isoformat()
+        'created_at': m.created_at
     } for m in messages])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
 
 # API: Send message
 @app.route('/api/send', methods=['POST'])
@@ -2015,26 +2725,96 @@ def api_send():
     result = send_sms(partner.phone, message, partner.id, media_url, media_type)
     return jsonify(result)
 
+# Broadcasts are sent from their own pool so a large send doesn't hold the request open, and a long
+# send can't starve the notifications/AI drafts queued on background_executor; the page polls the job until it's done
+broadcast_executor = ThreadPoolExecutor(max_workers=2)
+BROADCAST_CHUNK_SIZE = 50
+# Upper bound on partner_ids for a single broadcast or scheduled message
+MAX_BROADCAST_RECIPIENTS = 1000
+
+def run_broadcast(job_id):
+    with app.app_context():
+        job = db.session.get(BroadcastJob, job_id)
+        job.status = 'sending'
+        db.session.commit()
+        
+        results = []
+        try:
+            # One query for all recipients, with what personalize_message needs already loaded
+            partners = Partner.query.filter(Partner.id.in_(job.partner_ids), Partner.opted_out.isnot(True)).options(
+                joinedload(Partner.region), joinedload(Partner.tsd)
+            ).all()
+            partners_by_id = {p.id: p for p in partners}
+            
+            # Personalize everything up front, while the partners are loaded
+            recipients = []
+            for pid in job.partner_ids:
+                partner = partners_by_id.get(pid)
+                if partner:
+                    recipients.append((partner.id, partner.phone, personalize_message(job.message_template, partner), partner.full_name))
+                else:
+                    recipients.append(None)  # unknown or opted out; still counts toward progress
+            
+            # Send in chunks so the job's progress and results move while a large broadcast is running.
+            # Results are kept as soon as a chunk returns, so sends that went out survive a later failure.
+            for start in range(0, len(recipients), BROADCAST_CHUNK_SIZE):
+                chunk = [r for r in recipients[start:start + BROADCAST_CHUNK_SIZE] if r]
+                chunk_results = send_sms_batch([(pid, phone, body) for pid, phone, body, _ in chunk], job.media_url, job.media_type)
+                results.extend({'partner': name, 'result': result} for (_, _, _, name), result in zip(chunk, chunk_results))
+                job.processed = min(start + BROADCAST_CHUNK_SIZE, len(recipients))
+                job.results = list(results)
+                db.session.commit()
+            job.status = 'done'
+        except Exception as e:
+            print(f"Broadcast {job_id} error: {e}")
+            db.session.rollback()
+            job.status = 'failed'
+        
+        job.results = results
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+
+def serialize_broadcast_job(job):
+    results = job.results or []
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'total': len(job.partner_ids),
+        'processed': job.processed or 0,
+        'sent': len(results),
+        'results': results
+    }
+
 # API: Broadcast
 @app.route('/api/broadcast', methods=['POST'])
 @login_required
 def api_broadcast():
     data = request.json
-    message_template = data['message']
+    user = get_current_user()
     partner_ids = data.get('partner_ids', [])
+    if len(partner_ids) > MAX_BROADCAST_RECIPIENTS:
+        return jsonify({'error': f'Too many recipients (max {MAX_BROADCAST_RECIPIENTS})'}), 413
+    
+    job = BroadcastJob(
+        tenant_id=user.tenant_id,
+        user_id=user.id,
+        message_template=data['message'],
+        partner_ids=partner_ids,
+        media_url=data.get('media_url'),
+        media_type=data.get('media_type')
+    )
+    db.session.add(job)
+    db.session.commit()
     
-    media_url = data.get('media_url')
-    media_type = data.get('media_type')
-    
-    results = []
-    for pid in partner_ids:
-        partner = Partner.query.get(pid)
-        if partner and not partner.opted_out:
-            message = personalize_message(message_template, partner)
-            result = send_sms(partner.phone, message, partner.id, media_url, media_type)
-            results.append({'partner': partner.full_name, 'result': result})
-    
-    return jsonify({'sent': len(results), 'results': results})
+    broadcast_executor.submit(run_broadcast, job.id)
+    return jsonify(serialize_broadcast_job(job)), 202
+
+@app.route('/api/broadcast/<int:job_id>')
+@login_required
+def api_broadcast_status(job_id):
+    user = get_current_user()
+    job = BroadcastJob.query.filter_by(id=job_id, tenant_id=user.tenant_id).first_or_404()
+    return jsonify(serialize_broadcast_job(job))
 
 # API: Scheduled Messages
 @app.route('/api/scheduled', methods=['GET', 'POST'])
@@ -2042,23 +2822,36 @@ def api_broadcast():
 def api_scheduled():
     if request.method == 'POST':
         data = request.json
+        if len(data['partner_ids']) > MAX_BROADCAST_RECIPIENTS:
+            return jsonify({'error': f'Too many recipients (max {MAX_BROADCAST_RECIPIENTS})'}), 413
         scheduled = ScheduledMessage(
             message_template=data['message'],
-            partner_ids=json.dumps(data['partner_ids']),
+            partner_ids=data['partner_ids'],
             media_url=data.get('media_url'),
             media_type=data.get('media_type'),
             scheduled_time=datetime.fromisoformat(data['scheduled_time'].replace('Z', '+00:00'))
         )
         db.session.add(scheduled)
         db.session.commit()
+        
+        # Wake the sender right when this one is due; the periodic poll is only a safety net
+        if scheduler:
+            run_date = scheduled.scheduled_time
+            if run_date.tzinfo is None:
+                run_date = run_date.replace(tzinfo=timezone.utc)
+            scheduler.add_job(send_scheduled_messages, 'date', run_date=run_date, misfire_grace_time=None)
         return jsonify({'success': True, 'id': scheduled.id})
     
-    scheduled = ScheduledMessage.query.filter_by(status='pending').order_by(ScheduledMessage.scheduled_time).all()
+    # Recipient counts come from the JSON column itself (json_array_length exists in both Postgres and SQLite)
+    scheduled = db.session.query(
+        ScheduledMessage.id, ScheduledMessage.message_template, ScheduledMessage.scheduled_time, ScheduledMessage.status,
+        func.json_array_length(ScheduledMessage.partner_ids).label('partner_count')
+    ).filter(ScheduledMessage.status == 'pending').order_by(ScheduledMessage.scheduled_time).all()
     return jsonify([{
         'id': s.id,
         'message': s.message_template,
-        'partner_count': len(json.loads(s.partner_ids)),
-        'scheduled_time': s.scheduled_time.isoformat(),
+        'partner_count': s.partner_count,
+        'scheduled_time': s.scheduled_time,
         'status': s.status
     } for s in scheduled])
 
@@ -2070,6 +2863,21 @@ def api_scheduled_delete(id):
     db.session.commit()
     return jsonify({'success': True})
 
+# Uploads above this size go to Cloudinary in chunks rather than as one request body
+UPLOAD_LARGE_THRESHOLD = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+
+# media_type -> Cloudinary resource_type (Cloudinary uses 'video' for audio too). The keys are also the
+# MIME major types we accept, for uploads and incoming MMS alike
+MEDIA_RESOURCE_TYPES = {'image': 'image', 'video': 'video', 'audio': 'video'}
+# Fallback when neither the form nor the MIME type says what the file is.
+# webm defaults to video; recordings send an explicit type or an audio/ MIME type
+UPLOAD_EXT_MEDIA_TYPES = {
+    'jpg': 'image', 'jpeg': 'image', 'png': 'image', 'gif': 'image',
+    'mp4': 'video', 'mov': 'video', 'avi': 'video', 'webm': 'video',
+    'mp3': 'audio', 'wav': 'audio', 'ogg': 'audio', 'm4a': 'audio',
+}
+
 # API: Upload media (now uses Cloudinary)
 @app.route('/api/upload', methods=['POST'])
 @login_required
@@ -2089,35 +2897,17 @@ def api_upload():
     filename = secure_filename(file.filename)
     ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
     
-    # Use explicit type if provided (from recordings)
-    if explicit_type in ['audio', 'video', 'image']:
+    # Explicit type (from recordings) wins, then the MIME type (more reliable for recordings), then the extension
+    mime_type = content_type.split('/', 1)[0] if '/' in content_type else ''
+    if explicit_type in MEDIA_RESOURCE_TYPES:
         media_type = explicit_type
-        resource_type = 'image' if explicit_type == 'image' else 'video'
-    # Check MIME type first (more reliable for recordings)
-    elif content_type.startswith('audio/'):
-        media_type = 'audio'
-        resource_type = 'video'  # Cloudinary uses 'video' for audio too
-    elif content_type.startswith('video/'):
-        media_type = 'video'
-        resource_type = 'video'
-    elif content_type.startswith('image/'):
-        media_type = 'image'
-        resource_type = 'image'
-    elif ext in ['jpg', 'jpeg', 'png', 'gif']:
-        media_type = 'image'
-        resource_type = 'image'
-    elif ext in ['mp4', 'mov', 'avi']:
-        media_type = 'video'
-        resource_type = 'video'
-    elif ext in ['mp3', 'wav', 'ogg', 'm4a']:
-        media_type = 'audio'
-        resource_type = 'video'
-    elif ext == 'webm':
-        # Default webm to video, but explicit type or MIME type check above should catch audio
-        media_type = 'video'
-        resource_type = 'video'
+    elif mime_type in MEDIA_RESOURCE_TYPES:
+        media_type = mime_type
     else:
+        media_type = UPLOAD_EXT_MEDIA_TYPES.get(ext)
+    if not media_type:
         return jsonify({'success': False, 'error': 'Unsupported file type'}), 400
+    resource_type = MEDIA_RESOURCE_TYPES[media_type]
     
     # Check if Cloudinary is configured
     if not os.environ.get('CLOUDINARY_CLOUD_NAME'):
@@ -2125,11 +2915,20 @@ def api_upload():
     
     try:
         # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            file,
-            resource_type=resource_type,
-            folder='silversky-sms'
-        )
+        if (request.content_length or 0) > UPLOAD_LARGE_THRESHOLD:
+            result = cloudinary.uploader.upload_large(
+                file.stream,
+                resource_type=resource_type,
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                filename=filename,
+                folder='silversky-sms'
+            )
+        else:
+            result = cloudinary.uploader.upload(
+                file,
+                resource_type=resource_type,
+                folder='silversky-sms'
+            )
         
         return jsonify({
             'success': True,
@@ -2139,6 +2938,12 @@ def api_upload():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+AI_SDR_INSTRUCTIONS = """You are an AI SDR (Sales Development Rep) assistant for a Strategic Partner Manager at SilverSky, a cybersecurity company.
+
+Your job is to draft SMS replies that the manager can review and send. Be helpful, professional, and concise.
+
+Write a single SMS reply (under 300 characters) that responds to the partner's last message. Be helpful and move the conversation forward. Do NOT include any preamble or explanation - just the SMS text itself."""
+
 # AI SDR: Generate draft reply for inbound message
 def generate_ai_draft(partner_id, message_id):
     """Generate AI draft reply in background"""
@@ -2168,8 +2973,7 @@ def generate_ai_draft(partner_id, message_id):
                 return
             
             # Get conversation history
-            messages = Message.query.filter_by(partner_id=partner_id).order_by(Message.created_at.desc()).limit(10).all()
-            messages.reverse()
+            messages = get_recent_messages(partner_id)
             
             conversation = []
             for m in messages:
@@ -2191,14 +2995,7 @@ def generate_ai_draft(partner_id, message_id):
             if user.calendar_link:
                 calendar_note = f"\n\nIf scheduling a meeting, suggest this calendar link: {user.calendar_link}"
             
-            prompt = f"""You are an AI SDR (Sales Development Rep) assistant for a Strategic Partner Manager at SilverSky, a cybersecurity company.
-
-Your job is to draft SMS replies that the manager can review and send. Be helpful, professional, and concise.
-{knowledge}
-{style_instruction}
-{calendar_note}
-
-Partner info:
+            prompt = f"""Partner info:
 - Name: {partner.full_name}
 - Company: {partner.company or 'Unknown'}
 - Region: {partner.region.name if partner.region else 'Unknown'}
@@ -2206,14 +3003,13 @@ Partner info:
 - Notes: {partner.notes or 'None'}
 
 Recent conversation:
-{conversation_text}
-
-Write a single SMS reply (under 300 characters) that responds to the partner's last message. Be helpful and move the conversation forward. Do NOT include any preamble or explanation - just the SMS text itself."""
+{conversation_text}{style_instruction}{calendar_note}"""
 
             print(f"AI SDR: Calling Claude API...")
             response = client.messages.create(
                 model="claude-sonnet-4-20250514",
                 max_tokens=200,
+                system=ai_system_blocks(AI_SDR_INSTRUCTIONS, knowledge),
                 messages=[{"role": "user", "content": prompt}]
             )
             
@@ -2236,6 +3032,9 @@ Write a single SMS reply (under 300 characters) that responds to the partner's l
             import traceback
             traceback.print_exc()
 
+# Replies that opt a partner out of further texts (matched against the whole trimmed, case-folded body)
+OPT_OUT_KEYWORDS = frozenset({'stop', 'unsubscribe', 'cancel', 'quit', 'end'})
+
 # Twilio webhook for incoming messages
 @app.route('/webhook/incoming', methods=['POST'])
 def webhook_incoming():
@@ -2248,23 +3047,17 @@ def webhook_incoming():
     media_type = None
     if num_media > 0:
         media_url = request.values.get('MediaUrl0', '')
-        content_type = request.values.get('MediaContentType0', '')
-        if 'image' in content_type:
-            media_type = 'image'
-        elif 'video' in content_type:
-            media_type = 'video'
-        elif 'audio' in content_type:
-            media_type = 'audio'
+        mime_type = request.values.get('MediaContentType0', '').split('/', 1)[0]
+        if mime_type in MEDIA_RESOURCE_TYPES:
+            media_type = mime_type
     
     # Find partner by phone across all tenants (webhook doesn't have session)
     partner = Partner.query.filter_by(phone=from_number).first()
     
     # Check for opt-out keywords
-    opt_out_keywords = ['stop', 'unsubscribe', 'cancel', 'quit', 'end']
-    if body.strip().lower() in opt_out_keywords:
+    if body.strip().casefold() in OPT_OUT_KEYWORDS:
         if partner:
-            partner.opted_out = True
-            db.session.commit()
+            partner.opted_out = True  # committed with the message below
     
     msg = None
     if partner:
@@ -2279,15 +3072,10 @@ def webhook_incoming():
         )
         db.session.add(msg)
         db.session.commit()
-        send_notification(partner.full_name, body)
+        background_executor.submit(send_notification, partner.full_name, body)
         
         # Generate AI draft reply (non-blocking)
-        try:
-            import threading
-            thread = threading.Thread(target=generate_ai_draft, args=(partner.id, msg.id))
-            thread.start()
-        except:
-            pass
+        background_executor.submit(generate_ai_draft, partner.id, msg.id)
     else:
         # Unknown sender - create partner with default tenant/user
         tenant = Tenant.query.first()
@@ -2301,11 +3089,9 @@ def webhook_incoming():
                 phone=from_number,
                 notes='Auto-created from incoming message'
             )
-            db.session.add(partner)
-            db.session.commit()
-            
+            # Partner and message go in one commit; the relationship fills in partner_id on flush
             msg = Message(
-                partner_id=partner.id,
+                partner=partner,
                 user_id=admin.id,
                 direction='inbound',
                 body=body,
@@ -2313,17 +3099,12 @@ def webhook_incoming():
                 media_type=media_type,
                 status='received'
             )
-            db.session.add(msg)
+            db.session.add_all([partner, msg])
             db.session.commit()
-            send_notification(from_number, body)
+            background_executor.submit(send_notification, from_number, body)
             
             # Generate AI draft for new contact too
-            try:
-                import threading
-                thread = threading.Thread(target=generate_ai_draft, args=(partner.id, msg.id))
-                thread.start()
-            except:
-                pass
+            background_executor.submit(generate_ai_draft, partner.id, msg.id)
     
     resp = MessagingResponse()
     return str(resp)
@@ -2342,9 +3123,12 @@ def webhook_status():
     
     return '', 200
 
-# Background job to send scheduled messages
+# Background job to send scheduled messages. Runs from both the periodic poll and per-message
+# date jobs, so runs are serialized to keep a due message from being picked up twice.
+scheduled_send_lock = threading.Lock()
+
 def send_scheduled_messages():
-    with app.app_context():
+    with scheduled_send_lock, app.app_context():
         now = datetime.utcnow()
         pending = ScheduledMessage.query.filter(
             ScheduledMessage.status == 'pending',
@@ -2352,16 +3136,42 @@ def send_scheduled_messages():
         ).all()
         
         for scheduled in pending:
-            partner_ids = json.loads(scheduled.partner_ids)
-            for pid in partner_ids:
-                partner = Partner.query.get(pid)
+            # One query for the whole batch, with what personalize_message needs already loaded
+            partners = Partner.query.filter(Partner.id.in_(scheduled.partner_ids)).options(
+                joinedload(Partner.region), joinedload(Partner.tsd)
+            ).all()
+            partners_by_id = {p.id: p for p in partners}
+            sends = []
+            for pid in scheduled.partner_ids:
+                partner = partners_by_id.get(pid)
                 if partner and not partner.opted_out:
-                    message = personalize_message(scheduled.message_template, partner)
-                    send_sms(partner.phone, message, partner.id, scheduled.media_url, scheduled.media_type)
+                    sends.append((partner.id, partner.phone, personalize_message(scheduled.message_template, partner)))
+            send_sms_batch(sends, scheduled.media_url, scheduled.media_type)
             
             scheduled.status = 'sent'
             db.session.commit()
 
+# Roll completed days of messages up into MessageDailyStat. The last rolled day is recomputed in case
+# messages committed just after the previous run still landed on it.
+def rollup_message_stats():
+    with app.app_context():
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        last_day = db.session.query(func.max(MessageDailyStat.day)).scalar()
+        
+        day = func.date(Message.created_at, type_=db.Date)
+        query = db.session.query(
+            day, Message.partner_id,
+            func.sum(case((Message.direction == 'inbound', 1), else_=0)),
+            func.sum(case((Message.direction == 'outbound', 1), else_=0))
+        ).filter(Message.created_at < today_start)
+        if last_day:
+            query = query.filter(Message.created_at >= datetime.combine(last_day, datetime.min.time()))
+            db.session.execute(delete(MessageDailyStat).where(MessageDailyStat.day >= last_day))
+        
+        for stat_day, partner_id, inbound, outbound in query.group_by(day, Message.partner_id):
+            db.session.add(MessageDailyStat(day=stat_day, partner_id=partner_id, inbound=inbound, outbound=outbound))
+        db.session.commit()
+
 # Initialize database with default tenant and products
 def init_db():
     with app.app_context():
@@ -2407,6 +3217,15 @@ def init_db():
                         except Exception as e:
                             print(f"Migration {table}.{column}: {e}")
                     
+                    # scheduled_message.partner_ids moved from JSON-encoded TEXT to a JSON column
+                    try:
+                        data_type = conn.execute(text("SELECT data_type FROM information_schema.columns WHERE table_name = 'scheduled_message' AND column_name = 'partner_ids'")).scalar()
+                        if data_type == 'text':
+                            conn.execute(text("ALTER TABLE scheduled_message ALTER COLUMN partner_ids TYPE JSON USING partner_ids::json"))
+                            conn.commit()
+                    except Exception as e:
+                        print(f"Migration scheduled_message.partner_ids: {e}")
+                    
                     # Now create any new tables (tenant, user)
                     db.create_all()
         except Exception as e:
@@ -2414,6 +3233,38 @@ def init_db():
             # Fallback: just try create_all
             db.create_all()
         
+        # Indexes for tables that predate them (create_all only indexes new tables)
+        from sqlalchemy import text
+        index_migrations = [
+            "CREATE INDEX IF NOT EXISTS ix_partner_region_id ON partner (region_id)",
+            "CREATE INDEX IF NOT EXISTS ix_partner_tsd_id ON partner (tsd_id)",
+            "CREATE INDEX IF NOT EXISTS ix_partner_company ON partner (company)",
+            "CREATE INDEX IF NOT EXISTS ix_partner_last_contacted ON partner (last_contacted)",
+            "CREATE INDEX IF NOT EXISTS ix_partner_phone ON partner (phone)",
+            "CREATE INDEX IF NOT EXISTS ix_message_partner_created ON message (partner_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_message_partner_inbound_created ON message (partner_id, created_at) WHERE direction = 'inbound'",
+            "CREATE INDEX IF NOT EXISTS ix_message_created_direction ON message (created_at, direction)",
+            "CREATE INDEX IF NOT EXISTS ix_message_unread ON message (partner_id) WHERE direction = 'inbound' AND status = 'received'",
+            "CREATE INDEX IF NOT EXISTS ix_message_twilio_sid ON message (twilio_sid) WHERE twilio_sid IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS ix_ai_knowledge_category_title ON ai_knowledge (category, title)",
+            "CREATE INDEX IF NOT EXISTS ix_ai_knowledge_tenant_category ON ai_knowledge (tenant_id, category)",
+            "CREATE INDEX IF NOT EXISTS ix_scheduled_message_pending_time ON scheduled_message (scheduled_time) WHERE status = 'pending'",
+        ]
+        if db.engine.dialect.name == 'postgresql':
+            # Trigram index so message search (ILIKE '%term%') can use an index
+            index_migrations += [
+                "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+                "CREATE INDEX IF NOT EXISTS ix_message_body_trgm ON message USING gin (body gin_trgm_ops)",
+            ]
+        with db.engine.connect() as conn:
+            for sql in index_migrations:
+                try:
+                    conn.execute(text(sql))
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Index migration failed ({sql}): {e}")
+        
         # Create default tenant if none exists
         tenant = Tenant.query.first()
         if not tenant:
@@ -2426,7 +3277,7 @@ def init_db():
             admin = User(
                 tenant_id=tenant.id,
                 username=APP_USERNAME,
-                password_hash=APP_PASSWORD,
+                password_hash=generate_password_hash(APP_PASSWORD),
                 role='admin',
                 first_name='Admin',
                 onboarding_step=0
@@ -2444,6 +3295,15 @@ def init_db():
                 db.session.add(Product(tenant_id=tenant.id, name=name))
             db.session.commit()
         
+        # Broadcasts run in this process's executor, so any job still pending/sending at startup was
+        # cut off by a restart; fail it so the page stops polling instead of waiting forever
+        stale = BroadcastJob.query.filter(BroadcastJob.status.in_(['pending', 'sending'])).update(
+            {'status': 'failed', 'completed_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        if stale:
+            print(f"Marked {stale} interrupted broadcast(s) as failed")
+        
         # Migration: Update existing records with tenant_id and user_id
         if admin:
             try:
@@ -2525,11 +3385,11 @@ def api_change_password():
         return jsonify({'success': False, 'error': 'Password must be at least 6 characters'}), 400
     
     # Check current password
-    if current_password != user.password_hash:
+    if not check_user_password(user, current_password):
         return jsonify({'success': False, 'error': 'Current password is incorrect'}), 400
     
     # Set new password
-    user.password_hash = new_password
+    user.password_hash = generate_password_hash(new_password)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -2539,8 +3399,11 @@ def api_change_password():
 def api_onboarding_status():
     user = get_current_user()
     tenant = get_current_tenant()
-    knowledge_count = AIKnowledge.query.filter_by(tenant_id=tenant.id).count()
-    partner_count = Partner.query.filter_by(user_id=user.id).count()
+    # Both counts in one round trip
+    knowledge_count, partner_count = db.session.query(
+        db.session.query(func.count(AIKnowledge.id)).filter(AIKnowledge.tenant_id == tenant.id).scalar_subquery(),
+        db.session.query(func.count(Partner.id)).filter(Partner.user_id == user.id).scalar_subquery(),
+    ).one()
     
     return jsonify({
         'current_step': user.onboarding_step,
@@ -2570,11 +3433,10 @@ def api_calendar_link():
     if request.method == 'POST':
         data = request.json
         user.calendar_link = data.get('calendar_link', '').strip()
-        db.session.commit()
         
-        # Also save to AI knowledge so AI knows about it
-        existing = AIKnowledge.query.filter_by(tenant_id=tenant.id, category='general', title=f'Calendar Link - {user.username}').first()
+        # Also save to AI knowledge so AI knows about it (same transaction as the link itself)
         if user.calendar_link:
+            existing = AIKnowledge.query.filter_by(tenant_id=tenant.id, category='general', title=f'Calendar Link - {user.username}').first()
             if existing:
                 existing.content = f"When {user.full_name} schedules meetings, use this calendar link: {user.calendar_link}"
             else:
@@ -2585,7 +3447,7 @@ def api_calendar_link():
                     content=f"When {user.full_name} schedules meetings, use this calendar link: {user.calendar_link}"
                 )
                 db.session.add(knowledge)
-            db.session.commit()
+        db.session.commit()
         
         return jsonify({'success': True})
     
@@ -2643,8 +3505,7 @@ def api_regenerate_draft(partner_id):
         return jsonify({'error': 'AI not configured'}), 400
     
     # Get conversation history
-    messages = Message.query.filter_by(partner_id=partner_id).order_by(Message.created_at.desc()).limit(10).all()
-    messages.reverse()
+    messages = get_recent_messages(partner_id)
     
     conversation = []
     for m in messages:
@@ -2666,14 +3527,7 @@ def api_regenerate_draft(partner_id):
     if user.calendar_link:
         calendar_note = f"\n\nIf scheduling a meeting, suggest this calendar link: {user.calendar_link}"
     
-    prompt = f"""You are an AI SDR (Sales Development Rep) assistant for a Strategic Partner Manager at SilverSky, a cybersecurity company.
-
-Your job is to draft SMS replies that the manager can review and send. Be helpful, professional, and concise.
-{knowledge}
-{style_instruction}
-{calendar_note}
-
-Partner info:
+    prompt = f"""Partner info:
 - Name: {partner.full_name}
 - Company: {partner.company or 'Unknown'}
 - Region: {partner.region.name if partner.region else 'Unknown'}
@@ -2681,14 +3535,15 @@ Partner info:
 - Notes: {partner.notes or 'None'}
 
 Recent conversation:
-{conversation_text}
+{conversation_text}{style_instruction}{calendar_note}
 
-Write a single SMS reply (under 300 characters) that responds to the partner's last message. Be helpful and move the conversation forward. Make this response DIFFERENT from any previous suggestions. Do NOT include any preamble or explanation - just the SMS text itself."""
+Make this response DIFFERENT from any previous suggestions."""
 
     try:
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=200,
+            system=ai_system_blocks(AI_SDR_INSTRUCTIONS, knowledge),
             messages=[{"role": "user", "content": prompt}]
         )
         
@@ -2764,7 +3619,7 @@ def api_admin_users():
         user = User(
             tenant_id=tenant.id,
             username=data['username'],
-            password_hash=data['password'],
+            password_hash=generate_password_hash(data['password']),
             role=data.get('role', 'user'),
             first_name=data.get('first_name'),
             last_name=data.get('last_name'),
@@ -2776,6 +3631,9 @@ def api_admin_users():
         return jsonify({'success': True, 'id': user.id})
     
     users = User.query.filter_by(tenant_id=tenant.id).order_by(User.username).all()
+    contact_counts = dict(db.session.query(Partner.user_id, func.count(Partner.id)).filter(
+        Partner.user_id.in_([u.id for u in users])
+    ).group_by(Partner.user_id).all())
     return jsonify([{
         'id': u.id,
         'username': u.username,
@@ -2785,8 +3643,8 @@ def api_admin_users():
         'email': u.email,
         'role': u.role,
         'is_active': u.is_active,
-        'last_login': u.last_login.isoformat() if u.last_login else None,
-        'contact_count': Partner.query.filter_by(user_id=u.id).count()
+        'last_login': u.last_login,
+        'contact_count': contact_counts.get(u.id, 0)
     } for u in users])
 
 @app.route('/api/admin/users/<int:id>', methods=['GET', 'PUT', 'DELETE'])
@@ -2797,7 +3655,7 @@ def api_admin_user(id):
     
     if request.method == 'DELETE':
         # Don't delete if they own contacts
-        if Partner.query.filter_by(user_id=id).count() > 0:
+        if db.session.query(exists().where(Partner.user_id == id)).scalar():
             return jsonify({'error': 'Cannot delete user with contacts. Reassign contacts first.'}), 400
         db.session.delete(user)
         db.session.commit()
@@ -2816,7 +3674,7 @@ def api_admin_user(id):
         if 'is_active' in data:
             user.is_active = data['is_active']
         if 'password' in data and data['password']:
-            user.password_hash = data['password']
+            user.password_hash = generate_password_hash(data['password'])
         db.session.commit()
         return jsonify({'success': True})
     
@@ -2853,10 +3711,15 @@ def api_reassign_contacts():
     return jsonify({'success': True, 'reassigned': count})
 
 # Initialize scheduler for scheduled messages
+scheduler = None
+
 def init_scheduler():
+    global scheduler
     from apscheduler.schedulers.background import BackgroundScheduler
     scheduler = BackgroundScheduler()
-    scheduler.add_job(send_scheduled_messages, 'interval', minutes=1)
+    # Date jobs added by api_scheduled send on time; this catches anything they miss (e.g. across restarts)
+    scheduler.add_job(send_scheduled_messages, 'interval', minutes=5)
+    scheduler.add_job(rollup_message_stats, 'interval', hours=1)
     scheduler.start()
 
 init_db()
@@ -2869,4 +3732,4 @@ if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
         pass  # Scheduler may already be running
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), threaded=True)